@@ -28,11 +28,11 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from .database import (
     is_admin, get_admins, add_admin, remove_admin, get_whitelist, add_whitelist, remove_whitelist, get_blacklisted_users, add_blacklisted_user, remove_blacklisted_user, edit_blacklisted_user, is_super_admin, get_super_admins,
-    add_pending_user, get_pending_users, remove_pending_user, get_user_details_by_id, get_user_id_by_username, set_whitelist_expiration, is_whitelisted, get_admins_paginated, get_whitelist_paginated, get_blacklisted_users_paginated, get_pending_users_paginated
+    add_pending_user, get_pending_users, remove_pending_user, get_user_details_by_id, get_user_id_by_username, set_whitelist_expiration, is_whitelisted, get_admins_paginated,
+    set_super_admin, get_pending_user_group_message, clear_pending_user_group_message
 )
 from datetime import datetime
-from .config import GROUP_CHAT_ID, TeamCloudverse_TOPIC_ID, DB_PATH
-import sqlite3
+from .config import GROUP_CHAT_ID, TeamCloudverse_TOPIC_ID
 from .Utilities import pagination, admin_required, super_admin_required, handle_errors
 from .database import get_known_user_username
 from .TeamCloudverse import handle_access_request as teamcloudverse_handle_access_request
@@ -226,17 +226,11 @@ async def manage_admins(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
         all_admins = get_admins()
         admins = [a for a in all_admins if not is_super_admin(a['telegram_id'])]
         admins, total_pages, _, _, pagination_buttons = pagination(admins, page, DEFAULT_PAGE_SIZE, "admin_prev_page", "admin_next_page")
-        conn = sqlite3.connect(str(DB_PATH))
-        cursor = conn.cursor()
-        cursor.execute("SELECT telegram_id, username, name FROM cloudverse_users")
-        users_data = {str(row[0]): {'username': row[1], 'name': row[2]} for row in cursor.fetchall()}
-        conn.close()
         text = ADMIN_LIST_TITLE
         buttons = []
         for admin in admins:
-            info = users_data.get(str(admin['telegram_id']), {})
-            full_name = info.get('name', '')
-            username = info.get('username', '') or admin.get('username', '')
+            full_name = admin.get('name') or ''
+            username = admin.get('username') or ''
             label = full_name or username or str(admin['telegram_id'])
             if username:
                 label += f" (@{username})"
@@ -272,17 +266,11 @@ async def manage_super_admins(update: Update, ctx: ContextTypes.DEFAULT_TYPE) ->
         page = ctx.user_data.get("super_admin_page", 0)
         all_super_admins = get_super_admins()
         super_admins, total_pages, _, _, pagination_buttons = pagination(all_super_admins, page, DEFAULT_PAGE_SIZE, "super_admin_prev_page", "super_admin_next_page")
-        conn = sqlite3.connect(str(DB_PATH))
-        cursor = conn.cursor()
-        cursor.execute("SELECT telegram_id, username, name FROM cloudverse_users")
-        users_data = {str(row[0]): {'username': row[1], 'name': row[2]} for row in cursor.fetchall()}
-        conn.close()
         text = SUPER_ADMIN_LIST_TITLE
         buttons = []
         for admin in super_admins:
-            info = users_data.get(str(admin['telegram_id']), {})
-            full_name = info.get('name', '')
-            username = info.get('username', '') or admin.get('username', '')
+            full_name = admin.get('name') or ''
+            username = admin.get('username') or ''
             label = full_name or username or str(admin['telegram_id'])
             if username:
                 label += f" (@{username})"
@@ -319,18 +307,12 @@ async def manage_whitelist(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> No
         whitelist, total_pages, _, _, pagination_buttons = pagination(all_whitelist, page, DEFAULT_PAGE_SIZE, "whitelist_prev_page", "whitelist_next_page")
         text = WHITELISTED_USERS_TITLE
         buttons = []
-        conn = sqlite3.connect(str(DB_PATH))
-        cursor = conn.cursor()
-        cursor.execute("SELECT telegram_id, username, name FROM cloudverse_users")
-        users_data = {str(row[0]): {'username': row[1], 'name': row[2]} for row in cursor.fetchall()}
-        conn.close()
         admins = set(str(a['telegram_id']) for a in get_admins())
         for user in whitelist:
             if str(user['telegram_id']) in admins:
                 continue
-            info = users_data.get(str(user['telegram_id']), {})
-            full_name = info.get('name', '')
-            username = info.get('username', '') or user.get('username', '')
+            full_name = user.get('name') or ''
+            username = user.get('username') or ''
             label = full_name or username or str(user['telegram_id'])
             if username:
                 label += f" (@{username})"
@@ -495,32 +477,17 @@ async def handle_access_actions(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
             await manage_admins(update, ctx)
         elif data.startswith("promote_admin:"):
             admin_id = data.split(":")[1]
-            import sqlite3
-            conn = sqlite3.connect(str(DB_PATH))
-            cursor = conn.cursor()
-            cursor.execute("UPDATE cloudverse_users SET is_super_admin = 1 WHERE telegram_id = ? AND role = 'admin'", (str(admin_id),))
-            conn.commit()
-            conn.close()
+            set_super_admin(admin_id, True)
             await q.edit_message_text(f"User {admin_id} has been promoted to Super Admin.")
             await manage_admins(update, ctx)
         elif data.startswith("demote_admin:"):
             admin_id = data.split(":")[1]
-            import sqlite3
-            conn = sqlite3.connect(str(DB_PATH))
-            cursor = conn.cursor()
-            cursor.execute("UPDATE cloudverse_users SET is_super_admin = 0 WHERE telegram_id = ? AND role = 'admin'", (str(admin_id),))
-            conn.commit()
-            conn.close()
+            set_super_admin(admin_id, False)
             await q.edit_message_text(f"User {admin_id} has been demoted from Admin.")
             await manage_admins(update, ctx)
         elif data.startswith("demote_super_admin:"):
             admin_id = data.split(":")[1]
-            import sqlite3
-            conn = sqlite3.connect(str(DB_PATH))
-            cursor = conn.cursor()
-            cursor.execute("UPDATE cloudverse_users SET is_super_admin = 0 WHERE telegram_id = ? AND role = 'admin'", (str(admin_id),))
-            conn.commit()
-            conn.close()
+            set_super_admin(admin_id, False)
             await q.edit_message_text(f"User {admin_id} has been demoted from Super Admin to Admin.")
             await manage_super_admins(update, ctx)
         elif data == "add_whitelist":
@@ -577,13 +544,8 @@ async def handle_access_actions(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
 
 @handle_errors
 async def update_group_topic_message_status(telegram_id, status_text, ctx, status_button=None):
-    conn = sqlite3.connect(str(DB_PATH))
-    cursor = conn.cursor()
-    cursor.execute("SELECT group_message_id FROM pending_users WHERE telegram_id=?", (str(telegram_id),))
-    row = cursor.fetchone()
-    conn.close()
-    if row and GROUP_CHAT_ID is not None and row[0] is not None:
-        message_id = row[0]
+    message_id = get_pending_user_group_message(telegram_id)
+    if GROUP_CHAT_ID is not None and message_id is not None:
         try:
             chat_id = int(str(GROUP_CHAT_ID))
             msg_id = int(str(message_id))
@@ -595,11 +557,7 @@ async def update_group_topic_message_status(telegram_id, status_text, ctx, statu
             )
         except Exception as e:
             pass
-        conn = sqlite3.connect(str(DB_PATH))
-        cursor = conn.cursor()
-        cursor.execute("UPDATE pending_users SET group_message_id = NULL WHERE telegram_id=?", (str(telegram_id),))
-        conn.commit()
-        conn.close()
+        clear_pending_user_group_message(telegram_id)
 
 @handle_errors
 async def post_access_request_to_group(ctx, telegram_id, username, first_name, last_name):
@@ -1,7 +1,7 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes
 from .drive import get_drive_service, get_user_info, get_folder_name
-from .database import get_user_default_folder_id, get_user_monthly_bandwidth, get_user_total_bandwidth, get_user_credentials, get_user_quota_info, is_admin
+from .database import get_user_default_folder_id, get_user_bandwidth_stats, get_user_credentials, get_user_quota_info, is_admin
 from datetime import datetime, timedelta
 from .MainMenu import BACK_BUTTON
 from .Utilities import handle_errors, format_size
@@ -129,8 +129,7 @@ async def handle_profile(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
         
         # Get bandwidth data
         current_month = datetime.now().strftime("%Y-%m")
-        monthly_bandwidth_bytes = get_user_monthly_bandwidth(telegram_id, current_month)
-        overall_bandwidth_bytes = get_user_total_bandwidth(telegram_id)
+        monthly_bandwidth_bytes, overall_bandwidth_bytes = get_user_bandwidth_stats(telegram_id, current_month)
         
         # Get quota information
         quota_info = get_user_quota_info(telegram_id)
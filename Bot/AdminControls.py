@@ -4,8 +4,7 @@ from .database import (
     get_whitelisted_users, is_admin, get_admins, get_whitelist, is_super_admin, get_all_users_for_analytics,
     get_user_quota_info, set_user_quota_limit, get_whitelisted_users_except_admins
 )
-import sqlite3
-from .config import GROUP_CHAT_ID, TeamCloudverse_TOPIC_ID, DB_PATH
+from .config import GROUP_CHAT_ID, TeamCloudverse_TOPIC_ID
 import uuid
 from datetime import datetime
 from .Utilities import pagination, handle_errors
@@ -646,7 +645,7 @@ async def handle_quota_user_details(update: Update, ctx: ContextTypes.DEFAULT_TY
     
     # Get user information
     regular_users = get_whitelisted_users_except_admins()
-    user_info = next((user for user in regular_users if user['telegram_id'] == user_id), None)
+    user_info = next((user for user in regular_users if str(user['telegram_id']) == user_id), None)
     
     if not user_info:
         await q.edit_message_text(
@@ -663,15 +662,8 @@ async def handle_quota_user_details(update: Update, ctx: ContextTypes.DEFAULT_TY
     name = user_info['name'] or 'N/A'
     display_name = f"@{username}" if username != 'N/A' else name
     
-    # Get joined timestamp (from whitelisted_users table)
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT approved_at FROM whitelisted_users WHERE telegram_id = ?", (user_id,))
-            result = cursor.fetchone()
-            joined_timestamp = result[0] if result and result[0] else "Unknown"
-    except Exception:
-        joined_timestamp = "Unknown"
+    # Joined timestamp (whitelist approval time, already loaded with the user)
+    joined_timestamp = user_info.get('approved_at') or "Unknown"
     
     text = (
         f"🎫 <b>User Quota Management</b>\n\n"
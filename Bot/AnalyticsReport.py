@@ -33,7 +33,7 @@ import tempfile
 from datetime import datetime, timedelta
 import sqlite3
 from .config import DB_PATH, GROUP_CHAT_ID, TeamCloudverse_TOPIC_ID
-from .database import is_admin, get_admins, get_all_users_for_analytics, get_user_upload_stats, get_user_monthly_bandwidth, get_user_top_file_types, get_user_upload_activity_by_hour, get_user_details_by_id, get_user_total_bandwidth, get_user_uploads_per_day, get_analytics_data
+from .database import is_admin, get_admins, get_all_users_for_analytics, get_user_upload_stats, get_user_bandwidth_stats, get_user_top_file_types, get_user_upload_activity_by_hour, get_user_details_by_id, get_user_uploads_per_day, get_analytics_data
 from .Utilities import pagination, handle_errors
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
@@ -537,7 +537,10 @@ async def generate_and_send_individual_report(update: Update, ctx: ContextTypes.
         import io
         from reportlab.platypus import Image
         # Get number of uploads and upload time range
-        upload_count, first_upload, last_upload = get_user_upload_stats(user_id)
+        upload_stats = get_user_upload_stats(user_id)
+        upload_count = upload_stats['total_uploads']
+        first_upload = upload_stats['first_upload']
+        last_upload = upload_stats['last_upload']
         # Upload history (per day)
         upload_history = get_user_uploads_per_day(user_id, days=30)
         # Activity histogram (by hour)
@@ -579,8 +582,8 @@ async def generate_and_send_individual_report(update: Update, ctx: ContextTypes.
         plt.figure(figsize=(4, 4))
         from datetime import datetime
         current_month = datetime.now().strftime("%Y-%m")
-        monthly_bandwidth = get_user_monthly_bandwidth(user_id, current_month)
-        overall_bandwidth = get_user_total_bandwidth(user_id) / (1024 * 1024)  # MB
+        monthly_bandwidth, overall_bandwidth = get_user_bandwidth_stats(user_id, current_month)
+        overall_bandwidth = overall_bandwidth / (1024 * 1024)  # MB
         monthly_bandwidth_mb = monthly_bandwidth / (1024 * 1024)
         previous_bandwidth = max(0, overall_bandwidth - monthly_bandwidth_mb)
         plt.pie([monthly_bandwidth_mb, previous_bandwidth],
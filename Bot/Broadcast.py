@@ -2,7 +2,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from .database import (
     is_admin, is_super_admin, create_broadcast_request, get_broadcast_request, update_broadcast_status, store_broadcast_group_message, get_broadcast_group_message,
-    update_broadcast_approvers, get_whitelisted_users_except_admins
+    append_broadcast_approver, get_whitelisted_users_except_admins
 )
 from .config import TeamCloudverse_TOPIC_ID, GROUP_CHAT_ID
 import uuid
@@ -248,8 +248,7 @@ async def handle_regular_admin_broadcast_approval(update: Update, ctx: ContextTy
                 return
             approvers = request.get('approvers', [])
             if not any(a['id'] == approver_id for a in approvers) and len(approvers) < 2:
-                approvers.append({'id': approver_id, 'username': approver_username})
-                update_broadcast_approvers(request_id, approvers)
+                approvers = append_broadcast_approver(request_id, approver_id, approver_username) or approvers
             if len(approvers) == 2:
                 update_broadcast_status(request_id, "approved")
                 await send_broadcast_message(ctx, request)
@@ -3,10 +3,9 @@ from telegram.ext import ContextTypes
 from .drive import list_files, create_folder, rename_file, delete_file, get_file_link, toggle_sharing, get_credentials
 from .Utilities import get_breadcrumb, format_human_size, format_size, handle_errors, handle_file_size, handle_folder_size, pagination
 import humanize
-import sqlite3
-from .config import DB_PATH
 import telegram
 from .drive import get_folder_name
+from .database import set_user_default_folder_id
 from typing import Any
 from .UserState import UserStateEnum
 import googleapiclient.discovery
@@ -146,12 +145,7 @@ async def handle_folder_navigation(update: Update, ctx: ContextTypes.DEFAULT_TYP
         if data.startswith("folder:"):
             folder_id = data.split("folder:")[1]
             if ctx.user_data.get("in_def_location"):
-                conn = sqlite3.connect(str(DB_PATH))
-                cursor = conn.cursor()
-                cursor.execute("UPDATE user_credentials SET default_upload_location = ? WHERE telegram_id = ? AND email_address_1 = ?", 
-                               (folder_id, telegram_id, current_account))
-                conn.commit()
-                conn.close()
+                set_user_default_folder_id(telegram_id, folder_id, current_account)
                 ctx.user_data.pop("in_def_location")
                 if q and hasattr(q, 'edit_message_text'):
                     await q.edit_message_text(DEFAULT_UPLOAD_LOCATION_UPDATED_MSG)
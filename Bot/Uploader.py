@@ -88,6 +88,7 @@ async def download_from_telegram(telegram_id, file_id, file_size, file_name, upd
 async def handle_file_upload(update, ctx):
     """Handle file upload from Telegram to Google Drive"""
     telegram_id = None
+    username = None
     preparing_message = None
     temp_file_path = None
     file_mime_type = None
@@ -97,8 +98,10 @@ async def handle_file_upload(update, ctx):
     try:
         if update.message and update.message.from_user:
             telegram_id = update.message.from_user.id
+            username = update.message.from_user.username
         elif update.callback_query and update.callback_query.from_user:
             telegram_id = update.callback_query.from_user.id
+            username = update.callback_query.from_user.username
         else:
             logger.warning("No valid user found in update")
             return
@@ -320,7 +323,7 @@ async def handle_file_upload(update, ctx):
                     file_type = file_mime_type or (os.path.splitext(file_name_to_use)[1][1:] if file_name_to_use else None)
                     logger.info(f"User {telegram_id} uploaded file '{uploaded_file['name']}' successfully. Size: {file_size_bytes} bytes.")
                     # After successful upload, log upload with message_id and chat_id
-                    insert_upload(telegram_id, getattr(file, 'file_id', None), getattr(file, 'file_name', None), file_size_bytes, getattr(file, 'mime_type', None), message_id, chat_id, status='success', error_message=None)
+                    insert_upload(telegram_id, getattr(file, 'file_id', None), getattr(file, 'file_name', None), file_size_bytes, getattr(file, 'mime_type', None), message_id, chat_id, status='success', error_message=None, username=username)
                     # Increment user's daily quota count
                     increment_user_quota(telegram_id)
         except Exception as e:
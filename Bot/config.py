@@ -87,6 +87,10 @@ CREDENTIALS_PATH = Path(__file__).parent.parent / "credentials" / "credentials.j
 # SQLite database file path
 DB_PATH = Path(__file__).parent.parent / "Cloudverse.db"
 
+# Development aid: when enabled, init_db checks the query plans of the hot
+# per-user queries and logs a warning if any of them falls back to a table scan
+CHECK_QUERY_PLANS = os.getenv("CHECK_QUERY_PLANS", "false").lower() in ("1", "true", "yes")
+
 # Logging configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # Default to INFO level logging
 
@@ -33,16 +33,687 @@ Author: CloudVerse Team
 License: Open Source
 """
 
+import atexit
+import contextlib
+import functools
+import itertools
+import queue
 import sqlite3
-from Bot.config import DB_PATH, SUPER_ADMIN_ID, CIPHER
-from datetime import datetime, timedelta
+import threading
+import time
+from Bot.config import DB_PATH, SUPER_ADMIN_ID, CIPHER, CHECK_QUERY_PLANS
+from datetime import datetime, timedelta, timezone
 import json
 from .Logger import database_logger as logger
 
+# ============================================================================
+# CONNECTION MANAGEMENT
+# ============================================================================
+
+# Size of sqlite3's per-connection prepared statement LRU (library default: 128)
+STATEMENT_CACHE_SIZE = 256
+
+# Hot-path SQL kept as module constants so every call hands sqlite3 the same
+# string and hits its statement cache instead of re-parsing
+SQL_GET_ADMIN_IDS = "SELECT telegram_id FROM administrators"
+SQL_ADD_ADMIN = "INSERT OR IGNORE INTO administrators (telegram_id, username, name, is_super_admin, promoted_by, promoted_at, last_updated) VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+SQL_SET_SUPER_ADMIN = "UPDATE administrators SET is_super_admin = ?, last_updated = CURRENT_TIMESTAMP WHERE telegram_id = ?"
+SQL_REMOVE_ADMIN = "DELETE FROM administrators WHERE telegram_id = ? RETURNING username, name, is_super_admin"
+SQL_GET_WHITELIST_EXPIRATION = "SELECT expiration_time FROM whitelisted_users WHERE telegram_id = ?"
+SQL_ADD_WHITELIST = "INSERT OR REPLACE INTO whitelisted_users (telegram_id, username, name, approved_by, approved_at, expiration_time, last_updated) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)"
+SQL_REMOVE_WHITELIST = "DELETE FROM whitelisted_users WHERE telegram_id = ? RETURNING username, name"
+SQL_REMOVE_BLACKLIST = "DELETE FROM blacklisted_users WHERE telegram_id = ? RETURNING username, name, restriction_type"
+SQL_REMOVE_PENDING = "DELETE FROM pending_users WHERE telegram_id = ? RETURNING username"
+SQL_ADD_PENDING = """
+    INSERT OR IGNORE INTO pending_users
+    (telegram_id, username, first_name, last_name, group_message_id, requested_at)
+    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+"""
+SQL_GET_PENDING_USERS = """
+    SELECT telegram_id, username, first_name, last_name, group_message_id, requested_at
+    FROM pending_users
+    ORDER BY requested_at ASC
+"""
+SQL_GET_PENDING_GROUP_MESSAGE = "SELECT group_message_id FROM pending_users WHERE telegram_id = ?"
+SQL_SET_PENDING_GROUP_MESSAGE = "UPDATE pending_users SET group_message_id = ? WHERE telegram_id = ?"
+SQL_GET_ADMIN_USERNAME = "SELECT username FROM administrators WHERE telegram_id = ?"
+SQL_GET_WHITELIST_USERNAME = "SELECT username FROM whitelisted_users WHERE telegram_id = ?"
+# Multi-table user lookups: one statement per lookup, each branch an index seek.
+# The leading rank column keeps the admin > whitelist > blacklist > pending
+# precedence the lookups have always had
+SQL_GET_USER_ID_BY_USERNAME = """
+    SELECT 1 AS rank, telegram_id FROM administrators WHERE username = ?
+    UNION ALL
+    SELECT 2, telegram_id FROM whitelisted_users WHERE username = ?
+    UNION ALL
+    SELECT 3, telegram_id FROM pending_users WHERE username = ?
+    ORDER BY rank LIMIT 1
+"""
+SQL_GET_USER_DETAILS = """
+    SELECT 1 AS rank, CASE WHEN is_super_admin THEN 'super_admin' ELSE 'admin' END,
+           username, name, promoted_at, last_updated, NULL, NULL, NULL
+    FROM administrators WHERE telegram_id = ?
+    UNION ALL
+    SELECT 2, 'whitelist', username, name, approved_at, last_updated, expiration_time, NULL, NULL
+    FROM whitelisted_users WHERE telegram_id = ?
+    UNION ALL
+    SELECT 3, 'blacklist', username, name, restricted_at, NULL, NULL, restriction_type, restriction_period
+    FROM blacklisted_users WHERE telegram_id = ?
+    UNION ALL
+    SELECT 4, 'pending', username, TRIM(COALESCE(first_name, '') || ' ' || COALESCE(last_name, '')),
+           requested_at, NULL, NULL, NULL, NULL
+    FROM pending_users WHERE telegram_id = ?
+    ORDER BY rank LIMIT 1
+"""
+SQL_GET_DEFAULT_FOLDER = "SELECT email_address_1, default_upload_location FROM user_credentials WHERE telegram_id = ?"
+SQL_SET_DEFAULT_FOLDER = "UPDATE user_credentials SET default_upload_location = ?, last_updated = CURRENT_TIMESTAMP WHERE telegram_id = ?"
+SQL_SET_DEFAULT_FOLDER_FOR_ACCOUNT = "UPDATE user_credentials SET default_upload_location = ?, last_updated = CURRENT_TIMESTAMP WHERE telegram_id = ? AND email_address_1 = ?"
+SQL_GET_USER_CREDENTIALS = """
+    SELECT telegram_id, username, name, email_address_1, email_address_2, 
+           email_address_3, primary_email_address, default_upload_location, 
+           parallel_uploads, last_updated
+    FROM user_credentials 
+    WHERE telegram_id = ?
+"""
+SQL_UPSERT_DRIVE_CREDENTIALS = """
+    INSERT INTO user_credentials
+    (telegram_id, username, name, primary_email_address, email_address_1, email_address_2, email_address_3,
+     credential_1, credential_2, credential_3, default_upload_location, parallel_uploads, last_updated)
+    VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10, COALESCE(?11, 'root'), COALESCE(?12, 1), CURRENT_TIMESTAMP)
+    ON CONFLICT(telegram_id) DO UPDATE SET
+        username = excluded.username,
+        name = excluded.name,
+        primary_email_address = excluded.primary_email_address,
+        email_address_1 = excluded.email_address_1,
+        email_address_2 = excluded.email_address_2,
+        email_address_3 = excluded.email_address_3,
+        credential_1 = excluded.credential_1,
+        credential_2 = excluded.credential_2,
+        credential_3 = excluded.credential_3,
+        default_upload_location = COALESCE(?11, default_upload_location),
+        parallel_uploads = COALESCE(?12, parallel_uploads),
+        last_updated = CURRENT_TIMESTAMP
+"""
+# Identifiers cannot be bound as parameters, so every table/column variant is
+# spelled out once here instead of being formatted into the SQL per call
+SQL_GET_ACCOUNTS_AND_PRIMARY = "SELECT email_address_1, email_address_2, email_address_3, primary_email_address FROM user_credentials WHERE telegram_id = ?"
+SQL_SET_PRIMARY_ACCOUNT = {
+    table: f"""
+        UPDATE {table}
+        SET primary_email_address = CASE WHEN ? IN (email_address_1, email_address_2, email_address_3) THEN ? ELSE NULL END,
+            last_updated = CURRENT_TIMESTAMP
+        WHERE telegram_id = ?
+    """
+    for table in ("user_credentials",)
+}
+SQL_REMOVE_DRIVE_CREDENTIAL = {
+    slot: f"UPDATE user_credentials SET credential_{slot} = NULL, email_address_{slot} = NULL, last_updated = CURRENT_TIMESTAMP WHERE telegram_id = ?"
+    for slot in (1, 2, 3)
+}
+# Quota row upsert: ?1 telegram_id, ?2 username (used for a new row only), ?3
+# uploads to add. Today's local date comes from SQLite, and a stored date other
+# than today resets the counter first. current_date is an SQL keyword (the UTC
+# date), so the column is always quoted.
+SQL_UPSERT_USER_QUOTA = """
+    INSERT INTO user_quota (telegram_id, username, daily_upload_limit, "current_date", daily_uploads_used, last_reset_time, last_updated)
+    VALUES (?1, ?2, 5, DATE('now', 'localtime'), ?3, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    ON CONFLICT(telegram_id) DO UPDATE SET
+        daily_uploads_used = CASE WHEN "current_date" IS excluded."current_date" THEN daily_uploads_used + ?3 ELSE ?3 END,
+        last_reset_time = CASE WHEN "current_date" IS excluded."current_date" THEN last_reset_time ELSE CURRENT_TIMESTAMP END,
+        last_updated = CASE WHEN ?3 > 0 THEN CURRENT_TIMESTAMP ELSE last_updated END,
+        "current_date" = excluded."current_date"
+    RETURNING daily_upload_limit, daily_uploads_used, "current_date", last_reset_time
+"""
+# Custom limit: only the limit changes on an existing row, so the day's usage and
+# reset bookkeeping are left to SQL_UPSERT_USER_QUOTA
+SQL_SET_USER_QUOTA_LIMIT = """
+    INSERT INTO user_quota (telegram_id, username, daily_upload_limit, "current_date", daily_uploads_used, last_reset_time, last_updated)
+    VALUES (?, ?, ?, DATE('now', 'localtime'), 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    ON CONFLICT(telegram_id) DO UPDATE SET
+        daily_upload_limit = excluded.daily_upload_limit,
+        last_updated = CURRENT_TIMESTAMP
+"""
+SQL_GET_BROADCAST_REQUEST = "SELECT request_id, requester_telegram_id, requester_username, message_text, media_type, media_file_id, approval_status, status, approved_by, approved_at, last_updated, target_count, group_message_id FROM broadcasts WHERE request_id = ?"
+# approved_by as a JSON array; legacy single-approver values and NULL start a fresh list
+_APPROVERS_ARRAY = "CASE WHEN NOT json_valid(approved_by) THEN '[]' WHEN json_type(approved_by) = 'array' THEN approved_by ELSE '[]' END"
+SQL_APPEND_BROADCAST_APPROVER = f"""
+    UPDATE broadcasts
+    SET approved_by = json_insert({_APPROVERS_ARRAY}, '$[#]', json_object('id', ?1, 'username', ?2)),
+        last_updated = CURRENT_TIMESTAMP
+    WHERE request_id = ?3
+      AND json_array_length({_APPROVERS_ARRAY}) < ?4
+      AND NOT EXISTS (SELECT 1 FROM json_each({_APPROVERS_ARRAY}) WHERE json_extract(value, '$.id') = ?1)
+    RETURNING approved_by
+"""
+SQL_INSERT_UPLOAD = """
+    INSERT INTO uploads 
+    (telegram_id, username, chat_id, message_id, file_name, file_type, file_size, 
+     status, error_message, upload_method, average_speed, upload_source, 
+     upload_duration, uploaded_at, upload_hour)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CAST(strftime('%H', 'now') AS INTEGER))
+"""
+SQL_GET_UPLOAD_BY_FILE_ID = """
+    SELECT id, telegram_id, username, chat_id, message_id, file_name, file_type,
+           file_size, status, error_message, upload_method, average_speed,
+           upload_source, upload_duration, uploaded_at
+    FROM uploads
+    WHERE file_id = ?
+    ORDER BY uploaded_at DESC
+    LIMIT 1
+"""
+SQL_UPDATE_UPLOAD_STATUS = """
+    UPDATE uploads
+    SET status = ?, error_message = ?, average_speed = ?, upload_duration = ?
+    WHERE id = ?
+"""
+# Write-behind form used by the upload writer thread: uploaded_at is the time
+# the row was queued and upload_hour is taken from it
+SQL_INSERT_QUEUED_UPLOAD = """
+    INSERT INTO uploads 
+    (telegram_id, username, chat_id, message_id, file_name, file_type, file_size, 
+     status, error_message, upload_method, average_speed, upload_source, 
+     upload_duration, uploaded_at, upload_hour, file_id)
+    VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10, ?11, ?12, ?13, ?14, CAST(substr(?14, 12, 2) AS INTEGER), ?15)
+"""
+# get_user_upload_stats and the per-user activity queries: bind (telegram_id, "-<days> days")
+SQL_USER_UPLOAD_TOTALS = """
+    SELECT COUNT(*),
+           COUNT(*) FILTER (WHERE status = 'success'),
+           COUNT(*) FILTER (WHERE status = 'failed'),
+           COALESCE(SUM(file_size) FILTER (WHERE status = 'success'), 0),
+           COALESCE(AVG(file_size) FILTER (WHERE status = 'success'), 0),
+           COALESCE(AVG(average_speed), 0),
+           MIN(uploaded_at),
+           MAX(uploaded_at)
+    FROM uploads
+    WHERE telegram_id = ? AND uploaded_at >= DATE('now', ?)
+"""
+SQL_USER_TOP_FILE_TYPE = """
+    SELECT file_type, COUNT(*) AS count FROM uploads
+    WHERE telegram_id = ? AND uploaded_at >= DATE('now', ?) AND file_type IS NOT NULL
+    GROUP BY file_type
+    ORDER BY count DESC
+    LIMIT 1
+"""
+SQL_USER_UPLOADS_BY_DAY = """
+    SELECT DATE(uploaded_at) AS upload_date, COUNT(*) AS count
+    FROM uploads
+    WHERE telegram_id = ? AND uploaded_at >= DATE('now', ?)
+    GROUP BY DATE(uploaded_at)
+    ORDER BY upload_date DESC
+"""
+SQL_USER_UPLOADS_BY_HOUR = """
+    SELECT upload_hour AS hour, COUNT(*) AS count
+    FROM uploads
+    WHERE telegram_id = ? AND uploaded_at >= DATE('now', ?)
+    GROUP BY upload_hour
+    ORDER BY hour
+"""
+# insert_dev_messages_many has no use for the new ids; executemany discards them anyway
+SQL_INSERT_DEV_MESSAGES = """
+    INSERT INTO dev_messages (user_telegram_id, username, user_name, sender_role, message, telegram_message_id, reply_to_id, delivery_status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, 0))
+"""
+SQL_INSERT_DEV_MESSAGE = SQL_INSERT_DEV_MESSAGES + "    RETURNING id\n"
+SQL_DEV_MESSAGE_NOTIFIED = "SELECT EXISTS(SELECT 1 FROM dev_messages WHERE user_telegram_id = ? AND sender_role = 'system' AND message = ?)"
+# Keyset pagination: idx_dev_messages_user_telegram_id already orders each
+# user's entries by rowid, so "id < ?" is a range seek rather than an OFFSET
+# walk, and ORDER BY id needs no sort. The first page binds _MAX_ROWID.
+SQL_GET_DEV_MESSAGES = """
+    SELECT id, user_telegram_id, username, user_name, sender_role, message, telegram_message_id, reply_to_id, delivery_status, delivered_at
+    FROM dev_messages
+    WHERE user_telegram_id = ? AND id < ?
+    ORDER BY id DESC
+    LIMIT ?
+"""
+_MAX_ROWID = (1 << 63) - 1
+SQL_MARK_DEV_MESSAGE_DELIVERED = "UPDATE dev_messages SET delivery_status = 1 WHERE id = ?"
+# get_user_bandwidth_stats: monthly and all-time totals from one index range.
+# get_user_monthly_bandwidth and get_user_total_bandwidth are wrappers over it
+SQL_GET_BANDWIDTH_STATS = """
+    SELECT COALESCE(SUM(file_size) FILTER (WHERE uploaded_at >= ?2 AND uploaded_at < ?3), 0),
+           COALESCE(SUM(file_size), 0)
+    FROM uploads
+    WHERE telegram_id = ?1 AND status = 'success'
+"""
+
+# cloudverse_history stores user_role and status as small integer codes rather
+# than repeating the same words in every row. Codes are positions in these
+# tuples, so new values must only ever be appended. A value missing from the
+# maps is stored as given (an INTEGER column keeps non-numeric text as text),
+# so it still round-trips, just without the space saving.
+HISTORY_USER_ROLES = ("admin", "super_admin", "whitelist", "whitelisted", "blacklist", "blacklisted", "pending")
+HISTORY_STATUSES = ("success", "failed", "pending", "cancelled", "completed", "expired")
+_USER_ROLE_CODES = {name: code for code, name in enumerate(HISTORY_USER_ROLES, 1)}
+_USER_ROLE_NAMES = dict(enumerate(HISTORY_USER_ROLES, 1))
+_HISTORY_STATUS_CODES = {name: code for code, name in enumerate(HISTORY_STATUSES, 1)}
+_HISTORY_STATUS_NAMES = dict(enumerate(HISTORY_STATUSES, 1))
+
+# get_cloudverse_history_events filters on any subset of these columns. Every
+# combination is spelled out once here, so each call runs one of 16 fixed
+# statements rather than a string assembled per call. A single statement with
+# "(? IS NULL OR col = ?)" predicates is not used: SQLite plans it once without
+# seeing the bindings, so it cannot use the telegram_id index and scans the table.
+HISTORY_EVENT_FILTERS = ("telegram_id", "action_taken", "status", "user_role")
+SQL_HISTORY_EVENTS = {
+    mask: "SELECT id, telegram_id, username, user_role, action_taken, status, handled_by, related_message_id, event_details, notes, event_time FROM cloudverse_history WHERE 1=1"
+          + "".join(f" AND {column} = ?" for column, used in zip(HISTORY_EVENT_FILTERS, mask) if used)
+    for mask in itertools.product((False, True), repeat=len(HISTORY_EVENT_FILTERS))
+}
+SQL_GET_USER_HISTORY = """
+    SELECT id, telegram_id, username, user_role, action_taken, status,
+           handled_by, related_message_id, event_details, notes, event_time
+    FROM cloudverse_history
+    WHERE telegram_id = ?
+    ORDER BY event_time DESC
+    LIMIT ?
+"""
+
+# Stored in the database file itself, so they are applied once per process by
+# the first connection rather than by every new one. WAL lets readers run
+# alongside a writer; page_size only takes effect while the file is still empty
+# (it must precede journal_mode=WAL).
+DATABASE_PRAGMAS = (
+    "PRAGMA page_size=4096",
+    "PRAGMA journal_mode=WAL",
+)
+
+# Per-connection settings, applied to every new connection. synchronous=NORMAL
+# is durable in WAL mode without an fsync per commit; mmap_size lets reads come
+# straight from the OS page cache instead of being copied through read() calls.
+CONNECTION_PRAGMAS = (
+    "PRAGMA busy_timeout=20000",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+)
+
+_database_configured = False
+_database_config_lock = threading.Lock()
+
+# Each thread keeps one open connection for its lifetime (see _get_conn)
+_thread_local = threading.local()
+
+# Serialises writes on the busy broadcast and upload paths; reads stay unlocked
+_write_lock = threading.RLock()
+
+def _connect():
+    """Open a connection to the bot database with the shared connection settings."""
+    global _database_configured
+    conn = sqlite3.connect(str(DB_PATH), timeout=20.0, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+    if not _database_configured:
+        with _database_config_lock:
+            if not _database_configured:
+                # An in-memory database has no file to switch into WAL mode
+                if str(DB_PATH) != ":memory:":
+                    for pragma in DATABASE_PRAGMAS:
+                        conn.execute(pragma)
+                _database_configured = True
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _get_conn():
+    """
+    Return this thread's persistent database connection, opening it on first use.
+
+    Use as `with _get_conn() as conn:` - the with block commits or rolls back
+    the transaction but leaves the connection open for the next call.
+    """
+    conn = getattr(_thread_local, "conn", None)
+    if conn is None:
+        conn = _connect()
+        _thread_local.conn = conn
+    return conn
+
+def _db_call(default=None, write=False):
+    """
+    Run a database function as one transaction on this thread's connection.
+
+    The wrapped function takes a cursor as its first parameter and callers
+    pass only the rest. Any exception is logged and `default` is returned
+    instead (called first when callable, so a fresh value is returned each
+    time); write=True also holds _write_lock for the transaction.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                with (_write_lock if write else contextlib.nullcontext()), _get_conn() as conn:
+                    return func(conn.cursor(), *args, **kwargs)
+            except Exception as e:
+                logger.error(f"{func.__name__} failed for {args}: {str(e)}", exc_info=True)
+                return default() if callable(default) else default
+        return wrapper
+    return decorator
+
+def _optimize(cursor=None):
+    """
+    Refresh query planner statistics with PRAGMA optimize.
+
+    This runs at startup and exit rather than per query, so the 0x10000 flag
+    is used to have SQLite check every table rather than only those queried
+    on this connection. PRAGMA optimize only refreshes existing statistics, so a
+    database that has never been analyzed gets a full ANALYZE first.
+    analysis_limit keeps either pass cheap on large tables.
+    """
+    def run(target):
+        target.execute("PRAGMA analysis_limit=400")
+        has_stats = (target.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+                     and target.execute("SELECT 1 FROM sqlite_stat1 LIMIT 1").fetchone())
+        target.execute("PRAGMA optimize=0x10002" if has_stats else "ANALYZE")
+
+    try:
+        if cursor is not None:
+            run(cursor)
+            return
+        with _get_conn() as conn:
+            run(conn)
+    except Exception as e:
+        logger.warning(f"PRAGMA optimize failed: {str(e)}")
+
+atexit.register(_optimize)
+
+def _check_query_plans(cursor):
+    """
+    Warn about hot queries whose plan contains a full table scan.
+
+    Each entry is (name, sql, number of parameters). These queries are all
+    expected to be index or rowid lookups, so a SCAN step means an index was
+    dropped or a query change stopped using it. Only runs with CHECK_QUERY_PLANS.
+    """
+    queries = (
+        ("SQL_GET_USER_DETAILS", SQL_GET_USER_DETAILS, 4),
+        ("SQL_GET_USER_CREDENTIALS", SQL_GET_USER_CREDENTIALS, 1),
+        ("SQL_GET_UPLOAD_BY_FILE_ID", SQL_GET_UPLOAD_BY_FILE_ID, 1),
+        ("SQL_USER_UPLOAD_TOTALS", SQL_USER_UPLOAD_TOTALS, 2),
+        ("SQL_USER_TOP_FILE_TYPE", SQL_USER_TOP_FILE_TYPE, 2),
+        ("SQL_USER_UPLOADS_BY_DAY", SQL_USER_UPLOADS_BY_DAY, 2),
+        ("SQL_USER_UPLOADS_BY_HOUR", SQL_USER_UPLOADS_BY_HOUR, 2),
+        ("SQL_GET_BANDWIDTH_STATS", SQL_GET_BANDWIDTH_STATS, 3),
+        ("SQL_GET_USER_HISTORY", SQL_GET_USER_HISTORY, 2),
+    )
+    for name, sql, param_count in queries:
+        try:
+            plan = cursor.execute(f"EXPLAIN QUERY PLAN {sql}", (None,) * param_count).fetchall()
+        except Exception as e:
+            logger.warning(f"Could not explain {name}: {str(e)}")
+            continue
+        scans = [detail for *_, detail in plan if detail.startswith("SCAN ") and detail != "SCAN CONSTANT ROW"]
+        if scans:
+            logger.warning(f"Query plan regression in {name}: {'; '.join(scans)}")
+
+class _TTLCache:
+    """Small thread-safe mapping whose entries expire ttl seconds after being set."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                return default
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                # Drop the oldest entry (dicts keep insertion order)
+                del self._data[next(iter(self._data))]
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+class _BatchWriter:
+    """
+    Background writer that drains a queue of rows in batches.
+
+    Each batch is everything queued within `interval` seconds of the first
+    row, up to `batch_size` rows; `write_batch(conn, rows)` is called with
+    the writer's own autocommit connection and must manage its transaction.
+    With a `maxsize`, producers never block: rows that arrive while the queue
+    is full are dropped and logged.
+    """
+
+    _STOP = object()
+
+    def __init__(self, name, write_batch, batch_size, interval, maxsize=0):
+        self.name = name
+        self._write_batch = write_batch
+        self._batch_size = batch_size
+        self._interval = interval
+        self._queue = queue.Queue(maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _put(self, row):
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            logger.warning(f"{self.name} queue is full, dropping a row")
+            return False
+
+    def put(self, row):
+        """Queue a row, starting the writer thread on first use; returns False if it was dropped."""
+        queued = self._put(row)
+        self._ensure_started()
+        return queued
+
+    def put_many(self, rows):
+        """Queue several rows; returns how many were queued."""
+        count = 0
+        for row in rows:
+            count += self._put(row)
+        if count:
+            self._ensure_started()
+        return count
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        conn = _connect()
+        conn.isolation_level = None
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+            rows = [item]
+            deadline = time.monotonic() + self._interval
+            while len(rows) < self._batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                rows.append(item)
+            self._write_batch(conn, rows)
+        conn.close()
+
+    def flush(self, timeout=5.0):
+        """Write out any queued rows and stop the writer thread."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        # Blocking put: the stop sentinel must not be dropped when the queue is full
+        self._queue.put(self._STOP)
+        thread.join(timeout)
+        self._thread = None
+
 # ============================================================================
 # DATABASE INITIALIZATION AND SCHEMA MANAGEMENT
 # ============================================================================
 
+# Indexes created by earlier versions of init_db that no query uses: they are
+# either duplicated by a UNIQUE/primary key index, on columns only ever filtered
+# together with telegram_id, or never filtered on at all. Dropped at startup so
+# writes don't keep paying to maintain them
+_OBSOLETE_INDEXES = (
+    "idx_administrators_username",
+    "idx_administrators_is_super_admin",  # two-valued key, replaced by the partial idx_administrators_super_admins
+    "idx_whitelisted_users_username",
+    "idx_whitelisted_users_expiration_time",
+    "idx_whitelisted_users_approved_by",
+    "idx_blacklisted_users_username",
+    "idx_blacklisted_users_restriction_type",
+    "idx_blacklisted_users_restriction_period",  # replaced by the partial idx_blacklisted_users_restriction_expiry
+    "idx_user_credentials_email_address_1",
+    "idx_user_credentials_primary_email_address",
+    "idx_broadcasts_requester_telegram_id",
+    "idx_broadcasts_requester_username",
+    "idx_broadcasts_status",
+    "idx_broadcasts_approved_by",
+    "idx_broadcasts_last_updated",
+    "idx_uploads_telegram_id",  # prefix of idx_uploads_user_time
+    "idx_uploads_user_status_time",  # prefix of idx_uploads_user_status_bw
+    "idx_uploads_user_type",  # replaced by the partial idx_uploads_user_status_filetype
+    "idx_uploads_username",
+    "idx_uploads_status",
+    "idx_cloudverse_history_telegram_id",  # prefix of idx_cloudverse_history_user_time
+    "idx_cloudverse_history_username",
+    "idx_cloudverse_history_action_taken",
+    "idx_cloudverse_history_user_role",
+    "idx_cloudverse_history_status",
+    "idx_dev_messages_delivery_status",
+    "idx_user_quota_current_date",
+)
+
+# Tables keyed by telegram_id. The id is stored as INTEGER so the primary key
+# is the table's rowid (no separate key index) and lookups compare integers.
+# These tables are deliberately not WITHOUT ROWID: with an INTEGER PRIMARY KEY
+# the rows already live in the key's B-tree, so it would only lose the rowid
+# alias and add a key comparison per lookup
+_INTEGER_ID_TABLES = (
+    "administrators",
+    "whitelisted_users",
+    "blacklisted_users",
+    "pending_users",
+    "user_credentials",
+    "user_quota",
+)
+
+# Tables that reference a user by Telegram ID without being keyed by it, and the
+# referencing column. Stored as INTEGER for the same reasons: smaller rows and
+# index entries, and integer comparisons in the per-user lookups.
+_INTEGER_ID_REFERENCES = {
+    "uploads": "telegram_id",
+    "cloudverse_history": "telegram_id",
+    "broadcasts": "requester_telegram_id",
+}
+
+# Columns stored as integer codes (see HISTORY_USER_ROLES). A table where any of
+# them is still declared TEXT is rebuilt and its words are translated on copy.
+_CODED_COLUMNS = {
+    "cloudverse_history": {"user_role": _USER_ROLE_CODES, "status": _HISTORY_STATUS_CODES},
+}
+
+def _column_type(cursor, table, column):
+    """Return the declared type of a column, or None if the table/column does not exist."""
+    for _, name, col_type, *_ in cursor.execute(f'PRAGMA table_info("{table}")').fetchall():
+        if name == column:
+            return col_type.upper()
+    return None
+
+def _add_column_if_missing(cursor, table, column, declaration):
+    """Add a column to an existing table; returns True if it had to be added."""
+    if _column_type(cursor, table, column) is not None:
+        return False
+    logger.info(f"Adding column {table}.{column}")
+    cursor.execute(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {declaration}')
+    return True
+
+def _legacy_column_type(cursor, table):
+    """Return (column, declared type) of the first column that predates the current schema, or None."""
+    columns = ("telegram_id",) if table in _INTEGER_ID_TABLES else ()
+    if table in _INTEGER_ID_REFERENCES:
+        columns = (_INTEGER_ID_REFERENCES[table],)
+    for column in (*columns, *_CODED_COLUMNS.get(table, ())):
+        col_type = _column_type(cursor, table, column)
+        if col_type is not None and col_type != "INTEGER":
+            return column, col_type
+    return None
+
+def _legacy_select(table, column):
+    """SELECT expression that converts a legacy column value to its current storage."""
+    if (column == "telegram_id" and table in _INTEGER_ID_TABLES) or column == _INTEGER_ID_REFERENCES.get(table):
+        return f'CAST("{column}" AS INTEGER)'
+    codes = _CODED_COLUMNS.get(table, {}).get(column)
+    if codes:
+        whens = " ".join(f"WHEN '{name}' THEN {code}" for name, code in codes.items())
+        return f'CASE "{column}" {whens} ELSE "{column}" END'
+    return f'"{column}"'
+
+def _stage_legacy_tables(cursor):
+    """
+    Move tables that still store telegram_id (or a coded column) as TEXT out of the way.
+
+    Each such table is renamed to <table>_legacy and the indexes that moved with
+    it are dropped, so the regular CREATE statements rebuild the table and its
+    indexes with the current schema. Returns the names of the staged tables.
+    """
+    staged = []
+    for table in dict.fromkeys((*_INTEGER_ID_TABLES, *_INTEGER_ID_REFERENCES, *_CODED_COLUMNS)):
+        legacy = _legacy_column_type(cursor, table)
+        if legacy is None:
+            continue
+        logger.info(f"Migrating {table}.{legacy[0]} from {legacy[1]} to INTEGER")
+        cursor.execute(f'DROP TABLE IF EXISTS "{table}_legacy"')
+        cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{table}_legacy"')
+        indexes = cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (f"{table}_legacy",)
+        ).fetchall()
+        for (index_name,) in indexes:
+            cursor.execute(f'DROP INDEX IF EXISTS "{index_name}"')
+        staged.append(table)
+    return staged
+
+def _restore_legacy_rows(cursor, staged):
+    """Copy rows from staged legacy tables into the rebuilt tables and drop the legacy copies."""
+    for table in staged:
+        legacy = f"{table}_legacy"
+        new_columns = [row[1] for row in cursor.execute(f'PRAGMA table_info("{table}")').fetchall()]
+        legacy_columns = {row[1] for row in cursor.execute(f'PRAGMA table_info("{legacy}")').fetchall()}
+        columns = [column for column in new_columns if column in legacy_columns]
+        select_list = ", ".join(_legacy_select(table, column) for column in columns)
+        column_list = ", ".join(f'"{column}"' for column in columns)
+        where = ""
+        if table in _INTEGER_ID_TABLES:
+            # Some legacy tables (user_credentials) had no key, so INSERT OR REPLACE
+            # left several rows per user; keep only the most recently written one
+            key = _legacy_select(table, "telegram_id")
+            where = f' WHERE rowid IN (SELECT MAX(rowid) FROM "{legacy}" GROUP BY {key})'
+        cursor.execute(f'INSERT OR IGNORE INTO "{table}" ({column_list}) SELECT {select_list} FROM "{legacy}"{where}')
+        logger.info(f"Migrated {cursor.rowcount} rows into {table}")
+        cursor.execute(f'DROP TABLE "{legacy}"')
+
 def init_db():
     """
     Initialize the SQLite database with all required tables and indexes.
@@ -63,6 +734,8 @@ def init_db():
     Performance Optimizations:
         - Strategic indexing on frequently queried columns
         - Proper data types for efficient storage
+        - telegram_id stored as INTEGER PRIMARY KEY (rowid alias); tables
+          created with the older TEXT key are migrated in place
         - Foreign key relationships where appropriate
         
     Error Handling:
@@ -76,234 +749,399 @@ def init_db():
     """
     logger.info("Starting database initialization")
     try:
-        logger.debug(f"Connecting to database at: {DB_PATH}")
+        logger.debug("Connecting to database at: %s", DB_PATH)
         
         # Use connection context manager for automatic transaction handling
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:  # This ensures transaction is committed or rolled back
-                cursor = conn.cursor()
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            # Run the whole schema setup (including any migration) as one transaction
+            cursor.execute("BEGIN")
+            staged = _stage_legacy_tables(cursor)
+                
+            # ================================================================
+            # ADMINISTRATORS TABLE - Admin and Super Admin Management
+            # ================================================================
+            logger.debug("Creating administrators table")
+            cursor.execute('''CREATE TABLE IF NOT EXISTS administrators (
+                telegram_id INTEGER PRIMARY KEY,   -- Telegram user ID (unique identifier)
+                username TEXT UNIQUE,              -- Telegram username (for easy identification)
+                name TEXT,                         -- Full name of the administrator
+                is_super_admin INTEGER DEFAULT 0,  -- 1 for super admin, 0 for regular admin
+                promoted_by TEXT,                  -- ID of admin who promoted this user
+                promoted_at TIMESTAMP,             -- When the promotion occurred
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP  -- Last modification time
+            )''')
+                
+            # Create indexes for efficient querying
+            # Partial covering index for get_super_admins: only super admin rows are indexed
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_administrators_super_admins ON administrators(telegram_id, username, name) WHERE is_super_admin = 1")
+            # Covering index for admin list rendering (get_admins) - served without touching the table
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_administrators_cover ON administrators(telegram_id, username, name, is_super_admin)")
+            # Analytics pages (SQL_ALL_USERS_FOR_ANALYTICS_PAGE) merge the user tables newest first;
+            # with each table read in that order the merge stops after OFFSET + LIMIT rows
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_administrators_promoted_at ON administrators(promoted_at DESC, telegram_id)")
                 
-                # ================================================================
-                # ADMINISTRATORS TABLE - Admin and Super Admin Management
-                # ================================================================
-                logger.debug("Creating administrators table")
-                cursor.execute('''CREATE TABLE IF NOT EXISTS administrators (
-                    telegram_id TEXT PRIMARY KEY,      -- Telegram user ID (unique identifier)
-                    username TEXT UNIQUE,              -- Telegram username (for easy identification)
-                    name TEXT,                         -- Full name of the administrator
-                    is_super_admin INTEGER DEFAULT 0,  -- 1 for super admin, 0 for regular admin
-                    promoted_by TEXT,                  -- ID of admin who promoted this user
-                    promoted_at TIMESTAMP,             -- When the promotion occurred
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP  -- Last modification time
-                )''')
+            # ================================================================
+            # WHITELISTED USERS TABLE - Users with Bot Access
+            # ================================================================
+            logger.debug("Creating whitelisted_users table")
+            cursor.execute('''CREATE TABLE IF NOT EXISTS whitelisted_users (
+                telegram_id INTEGER PRIMARY KEY,   -- Telegram user ID
+                username TEXT UNIQUE,              -- Telegram username
+                name TEXT,                         -- Full name of the user
+                approved_by TEXT,                  -- ID of admin who approved access
+                approved_at TIMESTAMP,             -- When access was granted
+                expiration_time TIMESTAMP,         -- When access expires (NULL for permanent)
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP  -- Last modification time
+            )''')
                 
-                # Create indexes for efficient querying
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_administrators_username ON administrators(username)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_administrators_is_super_admin ON administrators(is_super_admin)")
+            # Create indexes for efficient access control checks
+            # Partial index over time-limited users only, for expiry window scans
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_whitelisted_users_expiring ON whitelisted_users(expiration_time) WHERE expiration_time IS NOT NULL")
+            # Covering index for whitelist rendering (get_whitelist)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_whitelisted_users_cover ON whitelisted_users(telegram_id, username, name, expiration_time)")
+            # Newest-first order for analytics pages, see idx_administrators_promoted_at
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_whitelisted_users_approved_at ON whitelisted_users(approved_at DESC, telegram_id)")
                 
-                # ================================================================
-                # WHITELISTED USERS TABLE - Users with Bot Access
-                # ================================================================
-                logger.debug("Creating whitelisted_users table")
-                cursor.execute('''CREATE TABLE IF NOT EXISTS whitelisted_users (
-                    telegram_id TEXT PRIMARY KEY,      -- Telegram user ID
-                    username TEXT UNIQUE,              -- Telegram username
-                    name TEXT,                         -- Full name of the user
-                    approved_by TEXT,                  -- ID of admin who approved access
-                    approved_at TIMESTAMP,             -- When access was granted
-                    expiration_time TIMESTAMP,         -- When access expires (NULL for permanent)
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP  -- Last modification time
-                )''')
+            # ================================================================
+            # BLACKLISTED USERS TABLE - Restricted/Banned Users
+            # ================================================================
+            logger.debug("Creating blacklisted_users table")
+            cursor.execute('''CREATE TABLE IF NOT EXISTS blacklisted_users (
+                telegram_id INTEGER PRIMARY KEY,   -- Telegram user ID
+                username TEXT UNIQUE,              -- Telegram username
+                name TEXT,                         -- Full name of the user
+                restriction_type TEXT,             -- 'temporary' or 'permanent'
+                restriction_period TIMESTAMP,      -- When restriction expires (for temporary)
+                restricted_at TIMESTAMP,           -- When restriction was applied
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP  -- Last modification time
+            )''')
                 
-                # Create indexes for efficient access control checks
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_whitelisted_users_username ON whitelisted_users(username)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_whitelisted_users_expiration_time ON whitelisted_users(expiration_time)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_whitelisted_users_approved_by ON whitelisted_users(approved_by)")
+            # Create indexes for restriction management
+            # Partial index: only temporary bans carry a restriction_period (unban sweep)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_blacklisted_users_restriction_expiry ON blacklisted_users(restriction_period) WHERE restriction_period IS NOT NULL")
+            # Covering index matching get_blacklisted_users' ORDER BY last_updated DESC
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_blacklisted_users_cover ON blacklisted_users(last_updated, telegram_id, username, name, restriction_type, restriction_period)")
+            # Newest-first order for analytics pages, see idx_administrators_promoted_at
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_blacklisted_users_restricted_at ON blacklisted_users(restricted_at DESC, telegram_id)")
+            # User Credentials table
+            cursor.execute('''CREATE TABLE IF NOT EXISTS user_credentials (
+                telegram_id INTEGER PRIMARY KEY,
+                username TEXT,
+                name TEXT,
+                email_address_1 TEXT,
+                email_address_2 TEXT,
+                email_address_3 TEXT,
+                credential_1 TEXT,
+                credential_2 TEXT,
+                credential_3 TEXT,
+                primary_email_address TEXT,
+                default_upload_location TEXT DEFAULT 'root',
+                parallel_uploads INTEGER DEFAULT 1,
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )''')
+            # Pending Users table
+            cursor.execute('''CREATE TABLE IF NOT EXISTS pending_users (
+                telegram_id INTEGER PRIMARY KEY,
+                username TEXT,
+                first_name TEXT,
+                last_name TEXT,
+                group_message_id INTEGER,
+                requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_pending_users_username ON pending_users(username)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_pending_users_requested_at ON pending_users(requested_at)")
+            # Broadcasts table
+            cursor.execute('''CREATE TABLE IF NOT EXISTS broadcasts (
+                request_id TEXT PRIMARY KEY,
+                requester_telegram_id INTEGER,
+                requester_username TEXT,
+                group_message_id INTEGER,
+                message_text TEXT,
+                media_type TEXT,
+                media_file_id TEXT,
+                approval_status TEXT,
+                status TEXT,
+                approved_by TEXT, -- can be JSON list or single value
+                approved_at TIMESTAMP,
+                target_count INTEGER,
+                last_updated TIMESTAMP
+            )''')
+            # Partial index: approved broadcasts only (analytics count)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_broadcasts_approved ON broadcasts(approval_status) WHERE approval_status = 'approved'")
+            # Uploads table
+            cursor.execute('''CREATE TABLE IF NOT EXISTS uploads (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                telegram_id INTEGER,
+                username TEXT,
+                chat_id INTEGER,
+                message_id INTEGER,
+                file_name TEXT,
+                file_type TEXT,
+                file_size INTEGER,
+                status TEXT,
+                error_message TEXT,
+                upload_method TEXT,
+                average_speed REAL,
+                upload_source TEXT,
+                upload_duration REAL,
+                uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                upload_hour INTEGER,               -- Hour of uploaded_at (0-23), stored for hourly activity grouping
+                file_id TEXT                       -- Telegram file ID of the uploaded document
+            )''')
+            if _add_column_if_missing(cursor, "uploads", "upload_hour", "INTEGER"):
+                cursor.execute("UPDATE uploads SET upload_hour = CAST(strftime('%H', uploaded_at) AS INTEGER) WHERE uploaded_at IS NOT NULL")
+            _add_column_if_missing(cursor, "uploads", "file_id", "TEXT")
+            # get_upload_by_file_id: latest upload of a Telegram file. Not unique, the
+            # same file can be sent and uploaded more than once
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_uploads_file_id ON uploads(file_id, uploaded_at)")
+            # Per-user time-range scans (monthly bandwidth, per-day/per-hour activity)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_uploads_user_time ON uploads(telegram_id, uploaded_at)")
+            # Per-user status + time filters (successful-upload bandwidth, success/failure counts).
+            # file_size and file_type ride along so bandwidth and file type queries never touch the table
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_uploads_user_status_bw ON uploads(telegram_id, status, uploaded_at, file_size, file_type)")
+            # Per-user file type breakdown (get_user_top_file_types) groups in index order. Partial
+            # on its own filter, and status is a key column so the query is answered from the index alone
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_uploads_user_status_filetype ON uploads(telegram_id, status, file_type) WHERE status = 'success' AND file_type IS NOT NULL")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_uploads_uploaded_at ON uploads(uploaded_at)")
+            # CloudVerse History table
+            cursor.execute('''CREATE TABLE IF NOT EXISTS cloudverse_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                telegram_id INTEGER,
+                username TEXT,
+                user_role INTEGER,                 -- Code from HISTORY_USER_ROLES
+                action_taken TEXT,
+                status INTEGER,                    -- Code from HISTORY_STATUSES
+                handled_by TEXT,
+                related_message_id TEXT,
+                event_details TEXT,
+                notes TEXT,
+                event_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )''')
+            # Per-user history newest first (SQL_GET_USER_HISTORY) reads the index backwards
+            # and stops at LIMIT; the telegram_id prefix serves the event filters
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_cloudverse_history_user_time ON cloudverse_history(telegram_id, event_time)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_cloudverse_history_event_time ON cloudverse_history(event_time)")
+            # Developer Messages table
+            cursor.execute('''CREATE TABLE IF NOT EXISTS dev_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_telegram_id INTEGER NOT NULL,
+                username TEXT,
+                user_name TEXT,
+                sender_role TEXT NOT NULL, -- 'user' or 'developer'
+                message TEXT NOT NULL,
+                telegram_message_id INTEGER,
+                reply_to_id INTEGER,
+                delivery_status INTEGER DEFAULT 0,
+                delivered_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_dev_messages_user_telegram_id ON dev_messages(user_telegram_id)")
+            # User Quota table
+            cursor.execute('''CREATE TABLE IF NOT EXISTS user_quota (
+                telegram_id INTEGER PRIMARY KEY,
+                username TEXT,
+                daily_upload_limit INTEGER DEFAULT 5,
+                current_date TEXT,
+                daily_uploads_used INTEGER DEFAULT 0,
+                last_reset_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )''')
                 
-                # ================================================================
-                # BLACKLISTED USERS TABLE - Restricted/Banned Users
-                # ================================================================
-                logger.debug("Creating blacklisted_users table")
-                cursor.execute('''CREATE TABLE IF NOT EXISTS blacklisted_users (
-                    telegram_id TEXT PRIMARY KEY,      -- Telegram user ID
-                    username TEXT UNIQUE,              -- Telegram username
-                    name TEXT,                         -- Full name of the user
-                    restriction_type TEXT,             -- 'temporary' or 'permanent'
-                    restriction_period TIMESTAMP,      -- When restriction expires (for temporary)
-                    restricted_at TIMESTAMP,           -- When restriction was applied
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP  -- Last modification time
-                )''')
+            for index_name in _OBSOLETE_INDEXES:
+                cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
                 
-                # Create indexes for restriction management
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_blacklisted_users_username ON blacklisted_users(username)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_blacklisted_users_restriction_type ON blacklisted_users(restriction_type)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_blacklisted_users_restriction_period ON blacklisted_users(restriction_period)")
-                # User Credentials table
-                cursor.execute('''CREATE TABLE IF NOT EXISTS user_credentials (
-                    telegram_id TEXT,
-                    username TEXT,
-                    name TEXT,
-                    email_address_1 TEXT,
-                    email_address_2 TEXT,
-                    email_address_3 TEXT,
-                    credential_1 TEXT,
-                    credential_2 TEXT,
-                    credential_3 TEXT,
-                    primary_email_address TEXT,
-                    default_upload_location TEXT DEFAULT 'root',
-                    parallel_uploads INTEGER DEFAULT 1,
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )''')
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_credentials_telegram_id ON user_credentials(telegram_id)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_credentials_email_address_1 ON user_credentials(email_address_1)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_credentials_primary_email_address ON user_credentials(primary_email_address)")
-                # Pending Users table
-                cursor.execute('''CREATE TABLE IF NOT EXISTS pending_users (
-                    telegram_id TEXT PRIMARY KEY,
-                    username TEXT,
-                    first_name TEXT,
-                    last_name TEXT,
-                    group_message_id INTEGER,
-                    requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )''')
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_pending_users_username ON pending_users(username)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_pending_users_requested_at ON pending_users(requested_at)")
-                # Broadcasts table
-                cursor.execute('''CREATE TABLE IF NOT EXISTS broadcasts (
-                    request_id TEXT PRIMARY KEY,
-                    requester_telegram_id TEXT,
-                    requester_username TEXT,
-                    group_message_id INTEGER,
-                    message_text TEXT,
-                    media_type TEXT,
-                    media_file_id TEXT,
-                    approval_status TEXT,
-                    status TEXT,
-                    approved_by TEXT, -- can be JSON list or single value
-                    approved_at TIMESTAMP,
-                    target_count INTEGER,
-                    last_updated TIMESTAMP
-                )''')
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_broadcasts_requester_telegram_id ON broadcasts(requester_telegram_id)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_broadcasts_requester_username ON broadcasts(requester_username)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_broadcasts_status ON broadcasts(status)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_broadcasts_approved_by ON broadcasts(approved_by)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_broadcasts_last_updated ON broadcasts(last_updated)")
-                # Uploads table
-                cursor.execute('''CREATE TABLE IF NOT EXISTS uploads (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    telegram_id TEXT,
-                    username TEXT,
-                    chat_id INTEGER,
-                    message_id INTEGER,
-                    file_name TEXT,
-                    file_type TEXT,
-                    file_size INTEGER,
-                    status TEXT,
-                    error_message TEXT,
-                    upload_method TEXT,
-                    average_speed REAL,
-                    upload_source TEXT,
-                    upload_duration REAL,
-                    uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )''')
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_uploads_telegram_id ON uploads(telegram_id)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_uploads_username ON uploads(username)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_uploads_status ON uploads(status)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_uploads_uploaded_at ON uploads(uploaded_at)")
-                # CloudVerse History table
-                cursor.execute('''CREATE TABLE IF NOT EXISTS cloudverse_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    telegram_id TEXT,
-                    username TEXT,
-                    user_role TEXT,
-                    action_taken TEXT,
-                    status TEXT,
-                    handled_by TEXT,
-                    related_message_id TEXT,
-                    event_details TEXT,
-                    notes TEXT,
-                    event_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )''')
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_cloudverse_history_telegram_id ON cloudverse_history(telegram_id)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_cloudverse_history_username ON cloudverse_history(username)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_cloudverse_history_action_taken ON cloudverse_history(action_taken)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_cloudverse_history_user_role ON cloudverse_history(user_role)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_cloudverse_history_event_time ON cloudverse_history(event_time)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_cloudverse_history_status ON cloudverse_history(status)")
-                # Developer Messages table
-                cursor.execute('''CREATE TABLE IF NOT EXISTS dev_messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_telegram_id INTEGER NOT NULL,
-                    username TEXT,
-                    user_name TEXT,
-                    sender_role TEXT NOT NULL, -- 'user' or 'developer'
-                    message TEXT NOT NULL,
-                    telegram_message_id INTEGER,
-                    reply_to_id INTEGER,
-                    delivery_status INTEGER DEFAULT 0,
-                    delivered_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )''')
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_dev_messages_user_telegram_id ON dev_messages(user_telegram_id)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_dev_messages_delivery_status ON dev_messages(delivery_status)")
-                # User Quota table
-                cursor.execute('''CREATE TABLE IF NOT EXISTS user_quota (
-                    telegram_id TEXT PRIMARY KEY,
-                    username TEXT,
-                    daily_upload_limit INTEGER DEFAULT 5,
-                    current_date TEXT,
-                    daily_uploads_used INTEGER DEFAULT 0,
-                    last_reset_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )''')
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_quota_telegram_id ON user_quota(telegram_id)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_quota_current_date ON user_quota(current_date)")
+            _restore_legacy_rows(cursor, staged)
+            # Older rows stored restriction_period and expiration_time as str(datetime);
+            # normalise to the ISO-8601 'T' form so string comparisons against
+            # isoformat() hold. Runs after the restore so rows copied from a migrated
+            # table are covered too
+            cursor.execute("UPDATE blacklisted_users SET restriction_period = replace(restriction_period, ' ', 'T') WHERE restriction_period LIKE '% %'")
+            cursor.execute("UPDATE whitelisted_users SET expiration_time = replace(expiration_time, ' ', 'T') WHERE expiration_time LIKE '% %'")
+            if "uploads" in staged:
+                # Rows copied from a table that predates upload_hour
+                cursor.execute("UPDATE uploads SET upload_hour = CAST(strftime('%H', uploaded_at) AS INTEGER) WHERE upload_hour IS NULL AND uploaded_at IS NOT NULL")
                 
-                logger.info("Database initialization completed successfully")
-                logger.debug("All tables and indexes created/verified")
+            # Give the planner fresh statistics for the (possibly new) schema
+            _optimize(cursor)
+            if CHECK_QUERY_PLANS:
+                _check_query_plans(cursor)
+                
+            logger.info("Database initialization completed successfully")
+            logger.debug("All tables and indexes created/verified")
+        # Reload admin ids from the (possibly rebuilt) table on next use
+        _reset_admin_ids()
     except Exception as e:
         logger.error(f"Database initialization failed: {str(e)}", exc_info=True)
         raise
 
+# Usernames recorded alongside uploads and quota rows come from the whitelist,
+# falling back to administrators. Membership rarely changes, so the lookup is
+# cached per user; every admin/whitelist insert or delete pops the entry.
+USERNAME_CACHE_TTL = 300
+USERNAME_CACHE_SIZE = 10000
+
+_username_cache = _TTLCache(USERNAME_CACHE_SIZE, USERNAME_CACHE_TTL)
+
+# Shared by every per-user cache. _drop_user_entries bumps the generation; a
+# lookup takes it before reading and only caches its result if no invalidation
+# happened meanwhile, so a read that raced a committed write cannot put the old
+# state back after the pop.
+_user_cache_generation = 0
+_user_cache_lock = threading.Lock()
+
+def _cache_user_entry(cache, key, value, generation):
+    with _user_cache_lock:
+        if generation == _user_cache_generation:
+            cache.set(key, value)
+
+def _drop_user_entries(key, *caches):
+    global _user_cache_generation
+    with _user_cache_lock:
+        _user_cache_generation += 1
+        for cache in caches:
+            cache.pop(key)
+
+def _lookup_username(telegram_id):
+    """Return (username, role) for a user, role being 'whitelist', 'admin' or None."""
+    key = int(telegram_id)
+    cached = _username_cache.get(key)
+    if cached is not None:
+        return cached
+    generation = _user_cache_generation
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_GET_WHITELIST_USERNAME, (key,))
+        row = cursor.fetchone()
+        if row:
+            result = (row[0], 'whitelist')
+        else:
+            cursor.execute(SQL_GET_ADMIN_USERNAME, (key,))
+            row = cursor.fetchone()
+            result = (row[0], 'admin') if row else (None, None)
+    _cache_user_entry(_username_cache, key, result, generation)
+    return result
+
+# is_whitelisted runs on nearly every update. Its answer is cached per user on
+# the same terms as usernames. The entry keeps the expiration time rather than
+# a yes/no, so an expiry is honoured even while the entry is cached.
+MEMBERSHIP_CACHE_TTL = 300
+MEMBERSHIP_CACHE_SIZE = 10000
+
+_whitelist_cache = _TTLCache(MEMBERSHIP_CACHE_SIZE, MEMBERSHIP_CACHE_TTL)
+
+def _invalidate_user(telegram_id):
+    """Drop cached username and whitelist membership after a role change."""
+    _drop_user_entries(int(telegram_id), _username_cache, _whitelist_cache)
+
+# Administrators are few and is_admin runs on nearly every update, so the full
+# set of admin ids is held in memory. It is loaded on first use and dropped by
+# every write to the administrators table once that write has committed. Load
+# and reset share a lock, so a load that read the old table cannot be stored
+# after the reset.
+_admin_ids = None
+_admin_ids_lock = threading.Lock()
+
+def _get_admin_ids():
+    global _admin_ids
+    ids = _admin_ids
+    if ids is None:
+        with _admin_ids_lock:
+            if _admin_ids is None:
+                with _get_conn() as conn:
+                    _admin_ids = frozenset(row[0] for row in conn.execute(SQL_GET_ADMIN_IDS))
+            ids = _admin_ids
+    return ids
+
+def _reset_admin_ids():
+    global _admin_ids
+    with _admin_ids_lock:
+        _admin_ids = None
+
+# Compared against on every admin check, so converted once
+_SUPER_ADMIN_ID = int(SUPER_ADMIN_ID) if SUPER_ADMIN_ID else None
+
 #Admin
 
 def add_admin(telegram_id, username=None, name=None, promoted_by=None, is_super_admin=0):
     """Add a new administrator to the system"""
     logger.info(f"Adding admin: telegram_id={telegram_id}, username={username}, is_super_admin={is_super_admin}")
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("INSERT OR IGNORE INTO administrators (telegram_id, username, name, is_super_admin, promoted_by, promoted_at, last_updated) VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)",
-                       (str(telegram_id), username, name, is_super_admin, promoted_by))
-                
-                # Log admin action
-                admin_type = "super_admin" if is_super_admin else "admin"
-                action_details = f"Added {admin_type}: {username or telegram_id}"
-                log_cloudverse_history_event(
-                    telegram_id=str(telegram_id),
-                    username=username,
-                    user_role=admin_type,
-                    action_taken="admin_promotion",
-                    status="success",
-                    handled_by=promoted_by,
-                    event_details=action_details
-                )
-                logger.info(f"Successfully added admin: {username or telegram_id}")
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_ADD_ADMIN, (int(telegram_id), username, name, is_super_admin, promoted_by))
+            _invalidate_analytics()
+        _invalidate_user(telegram_id)
+        _reset_admin_ids()
+            
+        # Log admin action
+        admin_type = "super_admin" if is_super_admin else "admin"
+        action_details = f"Added {admin_type}: {username or telegram_id}"
+        log_cloudverse_history_event(
+            telegram_id=telegram_id,
+            username=username,
+            user_role=admin_type,
+            action_taken="admin_promotion",
+            status="success",
+            handled_by=promoted_by,
+            event_details=action_details
+        )
+        logger.info(f"Successfully added admin: {username or telegram_id}")
     except Exception as e:
         logger.error(f"Failed to add admin {telegram_id}: {str(e)}", exc_info=True)
         raise
 
+def add_admins_bulk(rows):
+    """
+    Add many administrators in one transaction.
+
+    Args:
+        rows: iterable of (telegram_id, username, name, is_super_admin, promoted_by)
+            tuples, in the same order as add_admin's insert
+
+    Returns:
+        int: number of administrators inserted (existing admins are left as-is)
+    """
+    rows = [(int(row[0]),) + tuple(row[1:]) for row in rows]
+    logger.info(f"Adding {len(rows)} admins in bulk")
+    try:
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(SQL_ADD_ADMIN, rows)
+            _invalidate_analytics()
+            inserted = cursor.rowcount
+        for row in rows:
+            _invalidate_user(row[0])
+        _reset_admin_ids()
+        
+        events = []
+        for telegram_id, username, name, is_super_admin, promoted_by in rows:
+            admin_type = "super_admin" if is_super_admin else "admin"
+            events.append(dict(
+                telegram_id=telegram_id,
+                username=username,
+                user_role=admin_type,
+                action_taken="admin_promotion",
+                status="success",
+                handled_by=promoted_by,
+                event_details=f"Added {admin_type}: {username or telegram_id}"
+            ))
+        log_cloudverse_history_events_many(events)
+        logger.info(f"Successfully added {inserted} admins in bulk")
+        return inserted
+    except Exception as e:
+        logger.error(f"Failed to add admins in bulk: {str(e)}", exc_info=True)
+        raise
+
 def get_admins():
     """Retrieve all administrators from the database"""
     logger.debug("Retrieving all administrators")
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM administrators")
-                admins = [dict(zip([column[0] for column in cursor.description], row)) for row in cursor.fetchall()]
-        logger.debug(f"Retrieved {len(admins)} administrators")
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute("SELECT telegram_id, username, name, is_super_admin FROM administrators")
+            admins = [dict(row) for row in cursor]
+        logger.debug("Retrieved %s administrators", len(admins))
         return admins
     except Exception as e:
         logger.error(f"Failed to retrieve administrators: {str(e)}", exc_info=True)
@@ -311,29 +1149,25 @@ def get_admins():
 
 def get_super_admins():
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM administrators WHERE is_super_admin = 1")
-                super_admins = [dict(zip([column[0] for column in cursor.description], row)) for row in cursor.fetchall()]
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute("SELECT telegram_id, username, name, 1 AS is_super_admin FROM administrators WHERE is_super_admin = 1")
+            super_admins = [dict(row) for row in cursor]
         return super_admins
     except Exception as e:
         raise
 
 def is_admin(telegram_id):
     """Check if user is an administrator"""
-    logger.debug(f"Checking admin status for user {telegram_id}")
+    logger.debug("Checking admin status for user %s", telegram_id)
     try:
-        if str(telegram_id) == str(SUPER_ADMIN_ID):
-            logger.debug(f"User {telegram_id} is super admin")
+        key = int(telegram_id)
+        if key == _SUPER_ADMIN_ID:
+            logger.debug("User %s is super admin", telegram_id)
             return True
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT 1 FROM administrators WHERE telegram_id = ?", (str(telegram_id),))
-                result = cursor.fetchone()
-        is_admin_result = bool(result)
-        logger.debug(f"Admin check for user {telegram_id}: {is_admin_result}")
+        is_admin_result = key in _get_admin_ids()
+        logger.debug("Admin check for user %s: %s", telegram_id, is_admin_result)
         return is_admin_result
     except Exception as e:
         logger.error(f"Failed to check admin status for user {telegram_id}: {str(e)}", exc_info=True)
@@ -341,196 +1175,251 @@ def is_admin(telegram_id):
 
 def is_super_admin(telegram_id):
     try:
-        if not SUPER_ADMIN_ID:
+        if _SUPER_ADMIN_ID is None:
             return False
-        return str(telegram_id) == str(SUPER_ADMIN_ID)
+        return int(telegram_id) == _SUPER_ADMIN_ID
     except Exception as e:
         raise
 
+def set_super_admin(telegram_id, is_super_admin):
+    """
+    Promote an administrator to super admin or demote them back.
+
+    Returns:
+        bool: True if an administrator row was updated
+    """
+    logger.info(f"Setting is_super_admin={int(bool(is_super_admin))} for admin {telegram_id}")
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_SET_SUPER_ADMIN, (int(bool(is_super_admin)), int(telegram_id)))
+        return cursor.rowcount > 0
+
 def remove_admin(telegram_id, removed_by=None):
     try:
         if is_super_admin(telegram_id):
             raise ValueError("Cannot remove super admin (developer)")
         
-        # Get admin info before deletion for logging
-        admin_info = None
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
+        # Delete and fetch the removed row (for logging) in a single statement
+        with _get_conn() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT username, name, is_super_admin FROM administrators WHERE telegram_id = ?", (str(telegram_id),))
+            cursor.execute(SQL_REMOVE_ADMIN, (int(telegram_id),))
+            _invalidate_analytics()
             admin_info = cursor.fetchone()
+        _invalidate_user(telegram_id)
+        _reset_admin_ids()
         
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM administrators WHERE telegram_id = ?", (str(telegram_id),))
-                
-                # Log admin action
-                if admin_info:
-                    username, name, was_super_admin = admin_info
-                    admin_type = "super_admin" if was_super_admin else "admin"
-                    action_details = f"Removed {admin_type}: {username or name or telegram_id}"
-                    log_cloudverse_history_event(
-                        telegram_id=str(telegram_id),
-                        username=username,
-                        user_role=admin_type,
-                        action_taken="admin_demotion",
-                        status="success",
-                        handled_by=removed_by,
-                        event_details=action_details
-                    )
+        # Log admin action
+        if admin_info:
+            username, name, was_super_admin = admin_info
+            admin_type = "super_admin" if was_super_admin else "admin"
+            action_details = f"Removed {admin_type}: {username or name or telegram_id}"
+            log_cloudverse_history_event(
+                telegram_id=telegram_id,
+                username=username,
+                user_role=admin_type,
+                action_taken="admin_demotion",
+                status="success",
+                handled_by=removed_by,
+                event_details=action_details
+            )
     except Exception as e:
         raise
 
 #Whitelisted
 
+def _expiration_text(expiration_time):
+    """
+    Canonical stored form of a whitelist expiration: local-time isoformat() text.
+
+    Every expiry check is a plain string comparison against
+    datetime.now().isoformat(), so datetimes and ISO-8601 strings (either
+    separator) are converted here rather than stored in whatever form the
+    caller had. Raises ValueError for a string that is not ISO-8601.
+    """
+    if isinstance(expiration_time, str):
+        expiration_time = datetime.fromisoformat(expiration_time)
+    if isinstance(expiration_time, datetime):
+        return expiration_time.isoformat()
+    return expiration_time
+
 def add_whitelist(telegram_id, username=None, name=None, approved_by=None, approved_at=None, expiration_time=None):
     """Add user to whitelist with optional expiration"""
     logger.info(f"Adding user to whitelist: {telegram_id}, username: {username}, approved_by: {approved_by}")
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("INSERT OR REPLACE INTO whitelisted_users (telegram_id, username, name, approved_by, approved_at, expiration_time, last_updated) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
-                       (str(telegram_id), username, name, approved_by, approved_at, expiration_time))
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_ADD_WHITELIST, (int(telegram_id), username, name, approved_by, approved_at,
+                                               _expiration_text(expiration_time)))
+            _invalidate_analytics()
+        _invalidate_user(telegram_id)
+            
+        # Log admin action
+        action_details = f"Added to whitelist: {username or name or telegram_id}"
+        if expiration_time:
+            action_details += f" (expires: {expiration_time})"
+            logger.info(f"User {telegram_id} whitelisted with expiration: {expiration_time}")
+        else:
+            logger.info(f"User {telegram_id} whitelisted permanently")
                 
-                # Log admin action
-                action_details = f"Added to whitelist: {username or name or telegram_id}"
-                if expiration_time:
-                    action_details += f" (expires: {expiration_time})"
-                    logger.info(f"User {telegram_id} whitelisted with expiration: {expiration_time}")
-                else:
-                    logger.info(f"User {telegram_id} whitelisted permanently")
-                    
-                log_cloudverse_history_event(
-                    telegram_id=str(telegram_id),
-                    username=username,
-                    user_role="whitelisted",
-                    action_taken="whitelist_add",
-                    status="success",
-                    handled_by=approved_by,
-                    event_details=action_details
-                )
-                logger.info(f"Successfully added user {telegram_id} to whitelist")
+        log_cloudverse_history_event(
+            telegram_id=telegram_id,
+            username=username,
+            user_role="whitelisted",
+            action_taken="whitelist_add",
+            status="success",
+            handled_by=approved_by,
+            event_details=action_details
+        )
+        logger.info(f"Successfully added user {telegram_id} to whitelist")
     except Exception as e:
         logger.error(f"Failed to add user {telegram_id} to whitelist: {str(e)}", exc_info=True)
         raise
 
+def add_whitelist_bulk(rows):
+    """
+    Whitelist many users in one transaction.
+
+    Args:
+        rows: iterable of (telegram_id, username, name, approved_by, approved_at,
+            expiration_time) tuples, in the same order as add_whitelist's insert
+
+    Returns:
+        int: number of users written
+    """
+    rows = [(int(row[0]),) + tuple(row[1:5]) + (_expiration_text(row[5]),) for row in rows]
+    logger.info(f"Adding {len(rows)} users to whitelist in bulk")
+    try:
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(SQL_ADD_WHITELIST, rows)
+            _invalidate_analytics()
+        for row in rows:
+            _invalidate_user(row[0])
+        
+        events = []
+        for telegram_id, username, name, approved_by, approved_at, expiration_time in rows:
+            action_details = f"Added to whitelist: {username or name or telegram_id}"
+            if expiration_time:
+                action_details += f" (expires: {expiration_time})"
+            events.append(dict(
+                telegram_id=telegram_id,
+                username=username,
+                user_role="whitelisted",
+                action_taken="whitelist_add",
+                status="success",
+                handled_by=approved_by,
+                event_details=action_details
+            ))
+        log_cloudverse_history_events_many(events)
+        logger.info(f"Successfully added {len(rows)} users to whitelist in bulk")
+        return len(rows)
+    except Exception as e:
+        logger.error(f"Failed to add users to whitelist in bulk: {str(e)}", exc_info=True)
+        raise
+
 def get_whitelist():
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM whitelisted_users")
-                rows = cursor.fetchall()
-        result = [dict(zip([column[0] for column in cursor.description], row)) for row in rows]
-        return result
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute("SELECT telegram_id, username, name, expiration_time FROM whitelisted_users")
+            return [dict(row) for row in cursor]
     except Exception as e:
         raise
 
 def get_whitelisted_users():
     try:
-        import sqlite3
-        from Bot.config import DB_PATH
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT telegram_id, username, name FROM whitelisted_users")
-                rows = cursor.fetchall()
-                return [
-                    {'telegram_id': row[0], 'username': row[1], 'name': row[2]}
-                    for row in rows
-                ]
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute("SELECT telegram_id, username, name FROM whitelisted_users")
+            return [dict(row) for row in cursor]
     except Exception as e:
         return []
 
 def get_whitelisted_users_except_admins():
     try:
-        whitelisted_users = get_whitelisted_users()
-        admin_users = get_admins()
-        admin_ids = {admin['telegram_id'] for admin in admin_users}
-        return [user for user in whitelisted_users if user['telegram_id'] not in admin_ids]
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            # Anti-join: whitelisted users with no matching administrators row
+            cursor.execute("""
+                SELECT w.telegram_id, w.username, w.name, w.approved_at
+                FROM whitelisted_users w
+                LEFT JOIN administrators a ON a.telegram_id = w.telegram_id
+                WHERE a.telegram_id IS NULL
+            """)
+            return [dict(row) for row in cursor]
     except Exception as e:
         # Optionally log error
         return []
 
 def is_whitelisted(telegram_id):
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
+        key = int(telegram_id)
+        # Cached as (expiration_time,) for whitelisted users and False otherwise
+        entry = _whitelist_cache.get(key)
+        if entry is None:
+            generation = _user_cache_generation
+            with _get_conn() as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT expiration_time FROM whitelisted_users WHERE telegram_id = ?", (str(telegram_id),))
+                cursor.execute(SQL_GET_WHITELIST_EXPIRATION, (key,))
                 row = cursor.fetchone()
-        if row:
-            expiration_time = row[0]
-            if expiration_time is None or datetime.fromisoformat(expiration_time) > datetime.now():
-                return True
-        return False
+            entry = (row[0],) if row else False
+            _cache_user_entry(_whitelist_cache, key, entry, generation)
+        if not entry:
+            return False
+        # expiration_time is ISO-8601 text, so the expiry check is a string compare
+        return entry[0] is None or entry[0] > datetime.now().isoformat()
     except Exception as e:
         raise
 
 def set_whitelist_expiration(telegram_id, expiration_time):
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("UPDATE whitelisted_users SET expiration_time = ?, last_updated = CURRENT_TIMESTAMP WHERE telegram_id = ?", (expiration_time, str(telegram_id)))
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE whitelisted_users SET expiration_time = ?, last_updated = CURRENT_TIMESTAMP WHERE telegram_id = ?", (_expiration_text(expiration_time), int(telegram_id)))
+        _invalidate_user(telegram_id)
     except Exception as e:
         raise
 
 def get_whitelist_expiring_soon(minutes=30):
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                now = datetime.now()
-                soon = now + timedelta(minutes=minutes)
-                cursor.execute("SELECT telegram_id, username, name, expiration_time FROM whitelisted_users WHERE expiration_time IS NOT NULL")
-                users = []
-                for row in cursor.fetchall():
-                    exp_time = row[3]
-                    if exp_time:
-                        try:
-                            exp_dt = datetime.fromisoformat(exp_time)
-                            if now < exp_dt <= soon:
-                                users.append({
-                                    'telegram_id': row[0],
-                                    'username': row[1],
-                                    'name': row[2],
-                                    'expiration_time': exp_time
-                                })
-                        except Exception:
-                            continue
-                return users
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            now = datetime.now()
+            soon = now + timedelta(minutes=minutes)
+            # ISO-8601 strings sort chronologically, so the window is a plain range scan
+            cursor.execute("SELECT telegram_id, username, name, expiration_time FROM whitelisted_users WHERE expiration_time > ? AND expiration_time <= ?",
+                           (now.isoformat(), soon.isoformat()))
+            return [dict(row) for row in cursor]
     except Exception as e:
         raise
 
 def remove_whitelist(telegram_id, removed_by=None):
     try:
-        # Get user info before deletion for logging
-        user_info = None
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
+        # Delete and fetch the removed row (for logging) in a single statement
+        with _get_conn() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT username, name FROM whitelisted_users WHERE telegram_id = ?", (str(telegram_id),))
+            cursor.execute(SQL_REMOVE_WHITELIST, (int(telegram_id),))
+            _invalidate_analytics()
             user_info = cursor.fetchone()
+        _invalidate_user(telegram_id)
         
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM whitelisted_users WHERE telegram_id = ?", (str(telegram_id),))
-                
-                # Log admin action
-                if user_info:
-                    username, name = user_info
-                    action_details = f"Removed from whitelist: {username or name or telegram_id}"
-                    log_cloudverse_history_event(
-                        telegram_id=str(telegram_id),
-                        username=username,
-                        user_role="whitelisted",
-                        action_taken="whitelist_remove",
-                        status="success",
-                        handled_by=removed_by,
-                        event_details=action_details
-                    )
+        # Log admin action
+        if user_info:
+            username, name = user_info
+            action_details = f"Removed from whitelist: {username or name or telegram_id}"
+            log_cloudverse_history_event(
+                telegram_id=telegram_id,
+                username=username,
+                user_role="whitelisted",
+                action_taken="whitelist_remove",
+                status="success",
+                handled_by=removed_by,
+                event_details=action_details
+            )
     except Exception as e:
         raise
 
@@ -538,77 +1427,74 @@ def remove_whitelist(telegram_id, removed_by=None):
 
 def add_blacklisted_user(telegram_id, username, name, restriction_type, restriction_period=None, restricted_at=None, restricted_by=None):
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute('''INSERT OR REPLACE INTO blacklisted_users (telegram_id, username, name, restriction_type, restriction_period, restricted_at, last_updated) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)''',
-                       (str(telegram_id), username, name, restriction_type, restriction_period, restricted_at))
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            if isinstance(restriction_period, datetime):
+                restriction_period = restriction_period.isoformat()
+            cursor.execute('''INSERT OR REPLACE INTO blacklisted_users (telegram_id, username, name, restriction_type, restriction_period, restricted_at, last_updated) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)''',
+                   (int(telegram_id), username, name, restriction_type, restriction_period, restricted_at))
+            _invalidate_analytics()
                 
-                # Log admin action
-                action_details = f"Added to blacklist: {username or name or telegram_id} ({restriction_type})"
-                if restriction_period:
-                    action_details += f" until {restriction_period}"
-                log_cloudverse_history_event(
-                    telegram_id=str(telegram_id),
-                    username=username,
-                    user_role="blacklisted",
-                    action_taken="blacklist_add",
-                    status="success",
-                    handled_by=restricted_by,
-                    event_details=action_details
-                )
+            # Log admin action
+            action_details = f"Added to blacklist: {username or name or telegram_id} ({restriction_type})"
+            if restriction_period:
+                action_details += f" until {restriction_period}"
+            log_cloudverse_history_event(
+                telegram_id=telegram_id,
+                username=username,
+                user_role="blacklisted",
+                action_taken="blacklist_add",
+                status="success",
+                handled_by=restricted_by,
+                event_details=action_details
+            )
     except Exception as e:
         raise
 
 def get_blacklisted_users():
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM blacklisted_users ORDER BY last_updated DESC")
-                rows = cursor.fetchall()
-        result = [dict(zip([column[0] for column in cursor.description], row)) for row in rows]
-        return result
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute("SELECT telegram_id, username, name, restriction_type, restriction_period FROM blacklisted_users ORDER BY last_updated DESC")
+            return [dict(row) for row in cursor]
     except Exception as e:
         raise
 
 def edit_blacklisted_user(telegram_id, restriction_type, restriction_end=None):
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute('''UPDATE blacklisted_users SET restriction_type = ?, restriction_period = ?, last_updated = CURRENT_TIMESTAMP WHERE telegram_id = ?''',
-                       (restriction_type, restriction_end, str(telegram_id)))
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            if isinstance(restriction_end, datetime):
+                # Store ISO-8601 so expiry can be compared as a string in SQL
+                restriction_end = restriction_end.isoformat()
+            cursor.execute('''UPDATE blacklisted_users SET restriction_type = ?, restriction_period = ?, last_updated = CURRENT_TIMESTAMP WHERE telegram_id = ?''',
+                   (restriction_type, restriction_end, int(telegram_id)))
     except Exception as e:
         raise
 
 def remove_blacklisted_user(telegram_id, removed_by=None):
     try:
-        # Get user info before deletion for logging
-        user_info = None
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
+        # Delete and fetch the removed row (for logging) in a single statement
+        with _get_conn() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT username, name, restriction_type FROM blacklisted_users WHERE telegram_id = ?", (str(telegram_id),))
+            cursor.execute(SQL_REMOVE_BLACKLIST, (int(telegram_id),))
             user_info = cursor.fetchone()
+            _invalidate_analytics()
         
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM blacklisted_users WHERE telegram_id = ?", (str(telegram_id),))
-                
-                # Log admin action
-                if user_info:
-                    username, name, restriction_type = user_info
-                    action_details = f"Removed from blacklist: {username or name or telegram_id} (was {restriction_type})"
-                    log_cloudverse_history_event(
-                        telegram_id=str(telegram_id),
-                        username=username,
-                        user_role="blacklisted",
-                        action_taken="blacklist_remove",
-                        status="success",
-                        handled_by=removed_by,
-                        event_details=action_details
-                    )
+        # Log admin action
+        if user_info:
+            username, name, restriction_type = user_info
+            action_details = f"Removed from blacklist: {username or name or telegram_id} (was {restriction_type})"
+            log_cloudverse_history_event(
+                telegram_id=telegram_id,
+                username=username,
+                user_role="blacklisted",
+                action_taken="blacklist_remove",
+                status="success",
+                handled_by=removed_by,
+                event_details=action_details
+            )
     except Exception as e:
         raise
 
@@ -617,163 +1503,57 @@ def remove_blacklisted_user(telegram_id, removed_by=None):
 def unban_expired_temporary_blacklist():
     unbanned_users = []
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                now = datetime.now()
-                cursor.execute("SELECT telegram_id, restriction_period FROM blacklisted_users WHERE restriction_type = 'Temporary' AND restriction_period IS NOT NULL")
-                for row in cursor.fetchall():
-                    telegram_id, restriction_period = row
-                    if restriction_period:
-                        try:
-                            end_dt = datetime.fromisoformat(restriction_period)
-                            if end_dt < now:
-                                cursor.execute("DELETE FROM blacklisted_users WHERE telegram_id = ?", (str(telegram_id),))
-                                # logger.info(f"Automatically unbanned user {telegram_id} after temporary ban expired.")
-                                unbanned_users.append(telegram_id)
-                        except Exception:
-                            pass
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            # Expiry check and removal in one statement; RETURNING hands back who was unbanned
+            cursor.execute('''DELETE FROM blacklisted_users
+                              WHERE restriction_type = 'Temporary' AND restriction_period IS NOT NULL AND restriction_period <= ?
+                              RETURNING telegram_id, username''', (datetime.now().isoformat(),))
+            for telegram_id, username in cursor.fetchall():
+                logger.info(f"Automatically unbanned user {username or telegram_id} after temporary ban expired")
+                unbanned_users.append(telegram_id)
+            if unbanned_users:
+                _invalidate_analytics()
     except Exception as e:
         raise
     return unbanned_users
 
-def mark_expired_users():
-    newly_expired = []
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                now = datetime.now()
-                cursor.execute("SELECT telegram_id, username, name, expiration_time FROM whitelisted_users WHERE expiration_time IS NOT NULL")
-                for row in cursor.fetchall():
-                    telegram_id, username, name, expiration_time = row
-                    if expiration_time:
-                        try:
-                            exp_dt = datetime.fromisoformat(expiration_time)
-                            if exp_dt < now:
-                                # Split name into first and last name if possible
-                                first_name, last_name = (name.split(' ', 1) + [""])[:2] if name else ("", "")
-                                newly_expired.append({
-                                    'telegram_id': telegram_id,
-                                    'username': username,
-                                    'first_name': first_name,
-                                    'last_name': last_name
-                                })
-                                cursor.execute("UPDATE whitelisted_users SET role = 'expired', last_updated = CURRENT_TIMESTAMP WHERE telegram_id = ?", (str(telegram_id),))
-                        except Exception:
-                            pass
-    except Exception as e:
-        raise
-    return newly_expired
-
 #User Details Functions
 
-def get_user_details_by_id(telegram_id):
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                # Search all user tables for details
-                cursor.execute("SELECT telegram_id, username, name FROM administrators WHERE telegram_id = ?", (str(telegram_id),))
-                row = cursor.fetchone()
-                if row:
-                    return {"telegram_id": row[0], "username": row[1], "name": row[2]}
-                cursor.execute("SELECT telegram_id, username, name FROM whitelisted_users WHERE telegram_id = ?", (str(telegram_id),))
-                row = cursor.fetchone()
-        if row:
-            return {"telegram_id": row[0], "username": row[1], "name": row[2]}
-        cursor.execute("SELECT telegram_id, username, first_name || ' ' || last_name FROM pending_users WHERE telegram_id = ?", (str(telegram_id),))
-        row = cursor.fetchone()
-        if row:
-            return {"telegram_id": row[0], "username": row[1], "name": row[2]}
-        return None
-    except Exception as e:
-        raise
-
 def get_user_id_by_username(username):
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                # Search all user tables for username
-                cursor.execute("SELECT telegram_id FROM administrators WHERE username = ?", (username,))
-                row = cursor.fetchone()
-                if row:
-                    return row[0]
-                cursor.execute("SELECT telegram_id FROM whitelisted_users WHERE username = ?", (username,))
-                row = cursor.fetchone()
-        if row:
-            return row[0]
-        cursor.execute("SELECT telegram_id FROM pending_users WHERE username = ?", (username,))
-        row = cursor.fetchone()
-        if row:
-            return row[0]
-        return None
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            # Search all user tables for username in one statement
+            cursor.execute(SQL_GET_USER_ID_BY_USERNAME, (username, username, username))
+            row = cursor.fetchone()
+        return row[1] if row else None
     except Exception as e:
         raise
 
 def get_user_accounts_and_primary(telegram_id):
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                for table in ["user_credentials"]:
-                    cursor.execute(f"SELECT email_address_1, primary_email_address FROM {table} WHERE telegram_id = ?", (str(telegram_id),))
-                    row = cursor.fetchone()
-                    if row:
-                        accounts = [email for email in row[:1] if email]
-                        primary = row[1]
-                        return (accounts, primary, table)
-        return ([], None, None)
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_GET_ACCOUNTS_AND_PRIMARY, (int(telegram_id),))
+            row = cursor.fetchone()
+        if not row:
+            return ([], None, None)
+        accounts = [email for email in row[:3] if email]
+        return (accounts, row[3], "user_credentials")
     except Exception as e:
         raise
 
 def set_primary_account(telegram_id, email, table_name):
+    if table_name not in SQL_SET_PRIMARY_ACCOUNT:
+        raise ValueError(f"Unsupported account table: {table_name}")
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute(f"UPDATE {table_name} SET primary_email_address = ?, last_updated = CURRENT_TIMESTAMP WHERE telegram_id = ? AND email_address_1 = ?", (email, str(telegram_id), email))
-                cursor.execute(f"UPDATE {table_name} SET primary_email_address = NULL, last_updated = CURRENT_TIMESTAMP WHERE telegram_id = ? AND email_address_1 != ?", (str(telegram_id), email))
-    except Exception as e:
-        raise
-
-def get_user_default_folder_id(telegram_id, account_email=None):
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                if account_email:
-                    cursor.execute("SELECT default_upload_location FROM user_credentials WHERE telegram_id = ? AND email_address_1 = ?", (str(telegram_id), account_email))
-                else:
-                    cursor.execute("SELECT default_upload_location FROM user_credentials WHERE telegram_id = ?", (str(telegram_id),))
-                row = cursor.fetchone()
-        if row and row[0]:
-            return row[0]
-        return 'root'
-    except Exception as e:
-        raise
-
-def get_user_credentials(telegram_id):
-    """Get user credentials and settings from database."""
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("""SELECT default_upload_location, parallel_uploads, primary_email_address, 
-                                 email_address_1, email_address_2, email_address_3 
-                                 FROM user_credentials WHERE telegram_id = ?""", (str(telegram_id),))
-                row = cursor.fetchone()
-        if row:
-            return {
-                'default_folder_id': row[0] or 'root',
-                'parallel_uploads': row[1] or 1,
-                'primary_email_address': row[2],
-                'email_address_1': row[3],
-                'email_address_2': row[4],
-                'email_address_3': row[5]
-            }
-        return None
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_SET_PRIMARY_ACCOUNT[table_name], (email, email, int(telegram_id)))
+            updated = cursor.rowcount > 0
+        _invalidate_user_credentials(telegram_id)
+        return updated
     except Exception as e:
         raise
 
@@ -781,457 +1561,371 @@ def get_user_credentials(telegram_id):
 
 def create_broadcast_request(request_id, requester_telegram_id, requester_username, message_text, media_type=None, media_file_id=None, target_count=0, approval_status=None, status='pending', approved_by=None, approved_at=None, group_message_id=None, approvers=None):
     try:
-        import json
-        if approvers is None:
-            approvers = []
-        approvers_json = json.dumps(approvers)
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("""INSERT INTO broadcasts
-                         (request_id, requester_telegram_id, requester_username, message_text, media_type, media_file_id, approval_status, status, approved_by, approved_at, last_updated, target_count, group_message_id)
-                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                       (request_id, str(requester_telegram_id), requester_username, message_text, media_type, media_file_id, approval_status, status, approved_by, approved_at, datetime.now().isoformat(), target_count, group_message_id))
+        # Approvals are kept in approved_by as a JSON list (see update_broadcast_approvers)
+        if approved_by is None and approvers:
+            approved_by = json.dumps(approvers)
+        with _write_lock, _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""INSERT INTO broadcasts
+                     (request_id, requester_telegram_id, requester_username, message_text, media_type, media_file_id, approval_status, status, approved_by, approved_at, last_updated, target_count, group_message_id)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                   (request_id, int(requester_telegram_id), requester_username, message_text, media_type, media_file_id, approval_status, status, approved_by, approved_at, datetime.now().isoformat(), target_count, group_message_id))
+            _invalidate_analytics()
+        return True
     except Exception as e:
         raise
 
 def get_broadcast_request(request_id):
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT request_id, requester_telegram_id, requester_username, message_text, media_type, media_file_id, approval_status, status, approved_by, approved_at, last_updated, target_count, group_message_id FROM broadcasts WHERE request_id = ?", (request_id,))
-                row = cursor.fetchone()
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute(SQL_GET_BROADCAST_REQUEST, (request_id,))
+            row = cursor.fetchone()
         if row:
-            import json
-            try:
-                approvers = json.loads(row[12]) if row[12] else []
-            except Exception:
-                approvers = []
-            return {
-                'request_id': row[0],
-                'requester_telegram_id': row[1],
-                'requester_username': row[2],
-                'message_text': row[3],
-                'media_type': row[4],
-                'media_file_id': row[5],
-                'approval_status': row[6],
-                'status': row[7],
-                'approved_by': row[8],
-                'approved_at': row[9],
-                'last_updated': row[10],
-                'target_count': row[11],
-                'group_message_id': row[12],
-                'approvers': approvers
-            }
+            request = dict(row)
+            # approved_by holds either a single approver or a JSON list of approvals;
+            # only the list form needs decoding
+            approvers = []
+            approved_by = request['approved_by']
+            if approved_by and approved_by.startswith('['):
+                try:
+                    approvers = json.loads(approved_by)
+                except ValueError:
+                    approvers = []
+            request['approvers'] = approvers
+            return request
         return None
     except Exception as e:
         raise
 
 def update_broadcast_status(request_id, status):
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("UPDATE broadcasts SET status = ? WHERE request_id = ?", (status, request_id))
+        with _write_lock, _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE broadcasts SET status = ? WHERE request_id = ?", (status, request_id))
     except Exception as e:
         raise
 
 def store_broadcast_group_message(request_id, message_id):
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("UPDATE broadcasts SET group_message_id = ? WHERE request_id = ?", (message_id, request_id))
+        with _write_lock, _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE broadcasts SET group_message_id = ? WHERE request_id = ?", (message_id, request_id))
     except Exception as e:
         raise
 
 def get_broadcast_group_message(request_id):
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT group_message_id FROM broadcasts WHERE request_id = ?", (request_id,))
-                row = cursor.fetchone()
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT group_message_id FROM broadcasts WHERE request_id = ?", (request_id,))
+            row = cursor.fetchone()
         return row[0] if row else None
     except Exception as e:
         raise
 
 def update_broadcast_approvers(request_id, approvers):
     try:
-        import json
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                approvers_json = json.dumps(approvers)
-                cursor.execute("UPDATE broadcasts SET approved_by = ?, last_updated = CURRENT_TIMESTAMP WHERE request_id = ?", (approvers_json, request_id))
+        with _write_lock, _get_conn() as conn:
+            cursor = conn.cursor()
+            approvers_json = json.dumps(approvers)
+            cursor.execute("UPDATE broadcasts SET approved_by = ?, last_updated = CURRENT_TIMESTAMP WHERE request_id = ?", (approvers_json, request_id))
     except Exception as e:
         raise
 
-#Uploads Functions
+def append_broadcast_approver(request_id, approver_id, approver_username, max_approvers=2):
+    """Append one approval to a broadcast's approver list inside SQLite.
 
-def insert_upload(telegram_id, username, chat_id, message_id, file_name, file_type, file_size, status='success', error_message=None, upload_method=None, average_speed=None, upload_source=None, upload_duration=None, uploaded_at=None):
-    with sqlite3.connect(DB_PATH) as conn:
-        with conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO uploads (telegram_id, username, chat_id, message_id, file_name, file_type, file_size, status, error_message, upload_method, average_speed, upload_source, upload_duration, uploaded_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (telegram_id, username, chat_id, message_id, file_name, file_type, file_size, status, error_message, upload_method, average_speed, upload_source, upload_duration, uploaded_at))
-            upload_id = cursor.lastrowid
-    return upload_id
-
-def get_upload_by_file_id(file_id):
-    with sqlite3.connect(DB_PATH) as conn:
-        with conn:
+    The duplicate and limit checks run in the same UPDATE, so concurrent
+    approvals cannot exceed max_approvers. Returns the updated approver list,
+    or None if the approver was already present, the list was full or the
+    request does not exist. Use update_broadcast_approvers for bulk replacement.
+    """
+    try:
+        with _write_lock, _get_conn() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT telegram_id, username, chat_id, message_id, file_id, file_name, file_type, file_size, status, error_message, upload_time
-                FROM uploads WHERE file_id = ?
-                ORDER BY upload_time DESC LIMIT 1
-            ''', (file_id,))
+            cursor.execute(SQL_APPEND_BROADCAST_APPROVER, (str(approver_id), approver_username, request_id, max_approvers))
             row = cursor.fetchone()
-    if row:
-        return {
-            'telegram_id': row[0],
-            'username': row[1],
-            'chat_id': row[2],
-            'message_id': row[3],
-            'file_id': row[4],
-            'file_name': row[5],
-            'file_type': row[6],
-            'file_size': row[7],
-            'status': row[8],
-            'error_message': row[9],
-            'upload_time': row[10],
-        }
-    return None
-
-def get_user_upload_stats(user_id):
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*), MIN(upload_time), MAX(upload_time) FROM uploads WHERE telegram_id = ?", (user_id,))
-                stats = cursor.fetchone()
-        return stats if stats else (0, None, None)
+        return json.loads(row[0]) if row else None
     except Exception as e:
         raise
 
-def get_user_monthly_bandwidth(user_id, year_month):
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT SUM(file_size) FROM uploads WHERE telegram_id = ? AND strftime('%Y-%m', upload_time) = ?", (user_id, year_month))
-                total = cursor.fetchone()[0] or 0
-        return total
-    except Exception as e:
-        raise
+#Uploads Functions
 
 def get_bandwidth_today():
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT SUM(file_size) FROM uploads WHERE DATE(upload_time) = ?", (today,))
-                total = cursor.fetchone()[0] or 0
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            # Half-open range on the raw column so idx_uploads_uploaded_at can be used
+            cursor.execute("SELECT SUM(file_size) FROM uploads WHERE uploaded_at >= DATE('now', 'start of day') AND uploaded_at < DATE('now', 'start of day', '+1 day')")
+            total = cursor.fetchone()[0] or 0
         return total
     except Exception as e:
         raise
 
 def get_uploads_today():
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM uploads WHERE DATE(upload_time) = ?", (today,))
-                count = cursor.fetchone()[0]
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM uploads WHERE uploaded_at >= DATE('now', 'start of day') AND uploaded_at < DATE('now', 'start of day', '+1 day')")
+            count = cursor.fetchone()[0]
         return count
     except Exception as e:
         raise
 
-def get_user_top_file_types(user_id, limit=5):
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT file_type, COUNT(*) as cnt
-                    FROM uploads
-                    WHERE telegram_id = ?
-                    GROUP BY file_type
-                    ORDER BY cnt DESC
-                    LIMIT ?
-                """, (user_id, limit))
-                result = cursor.fetchall()
-        return result
-    except Exception as e:
-        raise
+#Team Cloudverse Functions
 
-def get_user_upload_activity_by_hour(user_id):
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT strftime('%H', upload_time) as hour, COUNT(*)
-                    FROM uploads
-                    WHERE telegram_id = ?
-                    GROUP BY hour
-                    ORDER BY hour
-                """, (user_id,))
-                result = cursor.fetchall()
-        return result
-    except Exception as e:
-        raise
+def _history_event(row):
+    """Build a history event dict from a sqlite3.Row, turning role/status codes back into names."""
+    event = dict(row)
+    event['user_role'] = _USER_ROLE_NAMES.get(event['user_role'], event['user_role'])
+    event['status'] = _HISTORY_STATUS_NAMES.get(event['status'], event['status'])
+    return event
+
+def iter_cloudverse_history_events(telegram_id=None, action_taken=None, status=None, user_role=None):
+    # Streams rows off the cursor as the caller consumes them, so memory stays
+    # flat however large the history table grows. Read-only, so no transaction
+    # block is held open across yields.
+    filters = (telegram_id, action_taken, status, user_role)
+    mask = tuple(bool(value) for value in filters)
+    if telegram_id:
+        telegram_id = int(telegram_id)
+    if status:
+        status = _HISTORY_STATUS_CODES.get(status, status)
+    if user_role:
+        user_role = _USER_ROLE_CODES.get(user_role, user_role)
+    params = [value for value in (telegram_id, action_taken, status, user_role) if value]
+    cursor = _get_conn().cursor()
+    cursor.row_factory = sqlite3.Row
+    try:
+        cursor.execute(SQL_HISTORY_EVENTS[mask], params)
+        for row in cursor:
+            yield _history_event(row)
+    finally:
+        cursor.close()
 
-def get_user_total_bandwidth(user_id):
+def get_cloudverse_history_events(telegram_id=None, action_taken=None, status=None, user_role=None):
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT SUM(file_size) FROM uploads WHERE telegram_id = ?", (user_id,))
-                total = cursor.fetchone()[0] or 0
-        return total
+        return list(iter_cloudverse_history_events(telegram_id, action_taken, status, user_role))
     except Exception as e:
         raise
 
-def get_user_uploads_per_day(user_id, days=30):
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    SELECT DATE(upload_time), COUNT(*)
-                    FROM uploads
-                    WHERE telegram_id = ? AND upload_time >= DATE('now', ?)
-                    GROUP BY DATE(upload_time)
-                    ORDER BY DATE(upload_time)
-                    """,
-                    (user_id, f'-{days} days')
-                )
-                result = cursor.fetchall()
-        return result
-    except Exception as e:
-        raise
+#Devloper Messages Functions
 
-#Team Cloudverse Functions
+def insert_dev_message(user_telegram_id, username, user_name, sender_role, message, telegram_message_id=None, reply_to_id=None, delivery_status=0):
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_INSERT_DEV_MESSAGE, (user_telegram_id, username, user_name, sender_role, message,
+                                                telegram_message_id, reply_to_id, delivery_status))
+        msg_id = cursor.fetchone()[0]
+    return msg_id
+
+def insert_dev_messages_many(rows):
+    """
+    Record many developer messages in one transaction.
 
-def log_cloudverse_history_event(telegram_id, action_taken, status=None, handled_by=None, related_message_id=None, event_details=None, notes=None, username=None, user_role=None):
+    Args:
+        rows: iterable of (user_telegram_id, username, user_name, sender_role,
+            message, telegram_message_id, reply_to_id, delivery_status) tuples,
+            in the same order as insert_dev_message's arguments; the trailing
+            optional fields may be omitted
+
+    Returns:
+        int: number of messages written
+    """
+    rows = [tuple(row) + (None,) * (8 - len(row)) for row in rows]
+    if not rows:
+        return 0
+    with _get_conn() as conn:
+        conn.executemany(SQL_INSERT_DEV_MESSAGES, rows)
+    return len(rows)
+
+def iter_dev_messages(user_telegram_id, limit=20, before_id=None):
+    # Streaming counterpart of fetch_dev_messages; see iter_cloudverse_history_events.
+    # Newest first by id; pass the last id of a page as before_id for the next one
+    cursor = _get_conn().cursor()
+    cursor.row_factory = sqlite3.Row
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO cloudverse_history (telegram_id, username, user_role, action_taken, status, handled_by, related_message_id, event_details, notes)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (telegram_id, username, user_role, action_taken, status, handled_by, related_message_id, event_details, notes))
-    except Exception as e:
-        raise
+        cursor.execute(SQL_GET_DEV_MESSAGES, (user_telegram_id, before_id if before_id is not None else _MAX_ROWID, limit))
+        for row in cursor:
+            yield dict(row)
+    finally:
+        cursor.close()
 
-def get_cloudverse_history_events(telegram_id=None, action_taken=None, status=None, user_role=None):
+def fetch_dev_messages(user_telegram_id, limit=20, before_id=None):
+    return list(iter_dev_messages(user_telegram_id, limit, before_id))
+
+# Delivery receipts are fire-and-forget for the handlers, so they are queued and
+# applied in batches behind the caller, like upload records.
+DELIVERY_BATCH_SIZE = 100
+DELIVERY_FLUSH_INTERVAL = 0.05
+
+def _write_delivery_batch(conn, rows):
+    """Mark a batch of queued developer messages as delivered in a single transaction."""
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                query = "SELECT id, telegram_id, username, user_role, action_taken, status, handled_by, related_message_id, event_details, notes, event_time FROM cloudverse_history WHERE 1=1"
-                params = []
-                if telegram_id:
-                    query += " AND telegram_id = ?"
-                    params.append(telegram_id)
-                if action_taken:
-                    query += " AND action_taken = ?"
-                    params.append(action_taken)
-                if status:
-                    query += " AND status = ?"
-                    params.append(status)
-                if user_role:
-                    query += " AND user_role = ?"
-                    params.append(user_role)
-                cursor.execute(query, params)
-                rows = cursor.fetchall()
-        return [
-            {
-                "id": r[0],
-                "telegram_id": r[1],
-                "username": r[2],
-                "user_role": r[3],
-                "action_taken": r[4],
-                "status": r[5],
-                "handled_by": r[6],
-                "related_message_id": r[7],
-                "event_details": r[8],
-                "notes": r[9],
-                "event_time": r[10],
-            } for r in rows
-        ]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(SQL_MARK_DEV_MESSAGE_DELIVERED, rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.debug("Marked %s developer messages delivered", len(rows))
     except Exception as e:
-        raise
+        logger.error(f"Failed to mark {len(rows)} developer messages delivered: {str(e)}", exc_info=True)
 
-#Devloper Messages Functions
+_delivery_writer = _BatchWriter("delivery-writer", _write_delivery_batch, DELIVERY_BATCH_SIZE, DELIVERY_FLUSH_INTERVAL)
 
-def insert_dev_message(user_telegram_id, username, user_name, sender_role, message, telegram_message_id=None, reply_to_id=None, delivery_status=0):
-    with sqlite3.connect(DB_PATH) as conn:
-        with conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO dev_messages (user_telegram_id, username, user_name, sender_role, message, telegram_message_id, reply_to_id, delivery_status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (user_telegram_id, username, user_name, sender_role, message, telegram_message_id, reply_to_id, delivery_status))
-            msg_id = cursor.lastrowid
-    return msg_id
+def flush_dev_message_deliveries(timeout=5.0):
+    """Apply any queued delivery receipts and stop the writer thread (called at exit)."""
+    _delivery_writer.flush(timeout)
 
-def fetch_dev_messages(user_telegram_id, limit=20):
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, user_telegram_id, username, user_name, sender_role, message, telegram_message_id, reply_to_id, delivery_status, delivered_at
-            FROM dev_messages
-            WHERE user_telegram_id = ?
-            ORDER BY delivered_at DESC
-            LIMIT ?
-        ''', (user_telegram_id, limit))
-        rows = cursor.fetchall()
-    return [
-        {
-            'id': row[0],
-            'user_telegram_id': row[1],
-            'username': row[2],
-            'user_name': row[3],
-            'sender_role': row[4],
-            'message': row[5],
-            'telegram_message_id': row[6],
-            'reply_to_id': row[7],
-            'delivery_status': row[8],
-            'delivered_at': row[9],
-        } for row in rows
-    ]
+atexit.register(flush_dev_message_deliveries)
 
 def mark_dev_message_delivered(msg_id):
-    with sqlite3.connect(DB_PATH) as conn:
-        with conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE dev_messages SET delivery_status = 1 WHERE id = ?
-            ''', (msg_id,))
+    """Queue a delivery receipt; delivery_status is updated by the writer thread shortly after."""
+    _delivery_writer.put((msg_id,))
 
 def fetch_dev_message_notified(user_telegram_id):
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _get_conn() as conn:
             cursor = conn.cursor()
-            cursor.execute('''SELECT 1 FROM dev_messages WHERE user_telegram_id = ? AND sender_role = 'system' AND message = ? LIMIT 1''', (user_telegram_id, 'notified'))
-            result = cursor.fetchone()
-        return bool(result)
-    except Exception as e:
-        raise
-
-def remove_pending_user(telegram_id):
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM pending_users WHERE telegram_id = ?", (str(telegram_id),))
+            cursor.execute(SQL_DEV_MESSAGE_NOTIFIED, (user_telegram_id, 'notified'))
+            return bool(cursor.fetchone()[0])
     except Exception as e:
         raise
 
 #Analytics/Utility Functions
 
-def get_all_users_for_analytics():
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT telegram_id, username, name FROM administrators
-                    UNION
-                    SELECT telegram_id, username, name FROM whitelisted_users
-                    UNION
-                    SELECT telegram_id, username, name FROM pending_users
-                """)
-                users = cursor.fetchall()
-                return users
-    except Exception as e:
-        raise
-
 def get_total_users():
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(DISTINCT telegram_id) FROM (SELECT telegram_id FROM administrators UNION SELECT telegram_id FROM whitelisted_users UNION SELECT telegram_id FROM pending_users)")
-                count = cursor.fetchone()[0]
-        return count
+        return _count_users("SELECT COUNT(DISTINCT telegram_id) FROM (SELECT telegram_id FROM administrators UNION SELECT telegram_id FROM whitelisted_users UNION SELECT telegram_id FROM pending_users)")
     except Exception as e:
         raise
 
+# Analytics are read far more often than the underlying tables change, so the
+# aggregate result is kept for a short TTL. Writes that affect any of the counts
+# (including admin, whitelist, pending and blacklist changes) bump
+# _analytics_epoch, which makes the cached result stale immediately.
+ANALYTICS_CACHE_TTL = 60
+
+_analytics_lock = threading.Lock()
+_analytics_epoch = 0
+_analytics_cache = None  # (epoch, expires_at, data)
+
+def _invalidate_analytics():
+    global _analytics_epoch
+    with _analytics_lock:
+        _analytics_epoch += 1
+
+# User totals for paginated listings and get_total_users: same epoch invalidation,
+# with a shorter TTL
+USER_COUNT_CACHE_TTL = 30
+
+_user_count_cache = _TTLCache(16, USER_COUNT_CACHE_TTL)
+
+def _count_users(sql, params=()):
+    """Run a single-value COUNT query, cached until the TTL or the next user table write."""
+    with _analytics_lock:
+        epoch = _analytics_epoch
+    key = (sql, params)
+    cached = _user_count_cache.get(key)
+    if cached is not None and cached[0] == epoch:
+        return cached[1]
+    with _get_conn() as conn:
+        count = conn.execute(sql, params).fetchone()[0]
+    _user_count_cache.set(key, (epoch, count))
+    return count
+
 def get_analytics_data():
+    global _analytics_cache
+    with _analytics_lock:
+        epoch = _analytics_epoch
+        cached = _analytics_cache
+    if cached and cached[0] == epoch and cached[1] > time.monotonic():
+        return dict(cached[2])
+    data = _compute_analytics_data()
+    if data:
+        with _analytics_lock:
+            if epoch == _analytics_epoch:
+                _analytics_cache = (epoch, time.monotonic() + ANALYTICS_CACHE_TTL, data)
+    return dict(data)
+
+def _compute_analytics_data():
     try:
-        import sqlite3
-        from .config import DB_PATH
-        from datetime import datetime, timedelta
         data = {}
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
+        with _get_conn() as conn:
             cursor = conn.cursor()
-            # Whitelisted users
-            cursor.execute("SELECT COUNT(*) FROM whitelisted_users")
-            data['whitelisted_count'] = cursor.fetchone()[0]
-            # Pending users
-            cursor.execute("SELECT COUNT(*) FROM pending_users")
-            data['pending_count'] = cursor.fetchone()[0]
-            # Admin users
-            cursor.execute("SELECT COUNT(*) FROM administrators")
-            data['admin_count'] = cursor.fetchone()[0]
-            # Total uploads
-            cursor.execute("SELECT COUNT(*) FROM uploads")
-            data['total_uploads'] = cursor.fetchone()[0]
-            # Recent uploads (last 7 days)
-            cursor.execute("SELECT COUNT(*) FROM uploads WHERE upload_time >= DATE('now', '-7 days')")
-            data['recent_uploads'] = cursor.fetchone()[0]
-            # Total broadcasts
-            cursor.execute("SELECT COUNT(*) FROM broadcasts")
-            data['total_broadcasts'] = cursor.fetchone()[0]
-            # Approved broadcasts
-            cursor.execute("SELECT COUNT(*) FROM broadcasts WHERE approval_status = 'approved'")
-            data['approved_broadcasts'] = cursor.fetchone()[0]
-            # Daily uploads (last 30 days)
-            cursor.execute("SELECT DATE(upload_time), COUNT(*) FROM uploads WHERE upload_time >= DATE('now', '-30 days') GROUP BY DATE(upload_time)")
-            data['daily_uploads'] = cursor.fetchall()
-            # Bandwidth usage (last 30 days)
-            cursor.execute("SELECT DATE(upload_time), SUM(file_size) FROM uploads WHERE upload_time >= DATE('now', '-30 days') GROUP BY DATE(upload_time)")
-            data['bandwidth_usage'] = [(row[0], row[1] or 0) for row in cursor.fetchall()]
+            # User counts - one statement, each subselect is a COUNT over its table's index
+            cursor.execute("""
+                SELECT (SELECT COUNT(*) FROM whitelisted_users),
+                       (SELECT COUNT(*) FROM pending_users),
+                       (SELECT COUNT(*) FROM administrators)
+            """)
+            data['whitelisted_count'], data['pending_count'], data['admin_count'] = cursor.fetchone()
+            # Total and recent (last 7 days) uploads in a single pass
+            cursor.execute("""
+                SELECT COUNT(*), COUNT(*) FILTER (WHERE uploaded_at >= DATE('now', '-7 days'))
+                FROM uploads
+            """)
+            data['total_uploads'], data['recent_uploads'] = cursor.fetchone()
+            # Total and approved broadcasts in a single pass
+            cursor.execute("""
+                SELECT COUNT(*), COUNT(*) FILTER (WHERE approval_status = 'approved')
+                FROM broadcasts
+            """)
+            data['total_broadcasts'], data['approved_broadcasts'] = cursor.fetchone()
+            # Daily uploads and bandwidth (last 30 days) share the same grouping
+            cursor.execute("""
+                SELECT DATE(uploaded_at), COUNT(*), SUM(file_size)
+                FROM uploads
+                WHERE uploaded_at >= DATE('now', '-30 days')
+                GROUP BY DATE(uploaded_at)
+            """)
+            daily_rows = cursor.fetchall()
+            data['daily_uploads'] = [(row[0], row[1]) for row in daily_rows]
+            data['bandwidth_usage'] = [(row[0], row[2] or 0) for row in daily_rows]
             # File type distribution (last 30 days)
-            cursor.execute("SELECT file_type, COUNT(*) FROM uploads WHERE upload_time >= DATE('now', '-30 days') GROUP BY file_type")
+            cursor.execute("SELECT file_type, COUNT(*) FROM uploads WHERE uploaded_at >= DATE('now', '-30 days') GROUP BY file_type")
             data['file_types'] = cursor.fetchall()
             # Activity by hour (last 30 days)
-            cursor.execute("SELECT strftime('%H', upload_time), COUNT(*) FROM uploads WHERE upload_time >= DATE('now', '-30 days') GROUP BY strftime('%H', upload_time)")
+            cursor.execute("SELECT upload_hour, COUNT(*) FROM uploads WHERE uploaded_at >= DATE('now', '-30 days') GROUP BY upload_hour")
             data['activity_by_hour'] = [(int(row[0]), row[1]) for row in cursor.fetchall()]
-            # User growth (last 30 days)
-            cursor.execute("SELECT DATE(created_at), COUNT(*) FROM administrators WHERE created_at >= DATE('now', '-30 days') GROUP BY DATE(created_at)")
+            # User growth (last 30 days) - whitelist approvals
+            cursor.execute("SELECT DATE(approved_at), COUNT(*) FROM whitelisted_users WHERE approved_at >= DATE('now', '-30 days') GROUP BY DATE(approved_at)")
             data['user_growth'] = cursor.fetchall()
-            # Storage usage (current)
-            cursor.execute("SELECT SUM(storage_quota) FROM administrators")
+            # Storage usage (current) - total bytes uploaded
+            cursor.execute("SELECT SUM(file_size) FROM uploads")
             data['storage_usage'] = cursor.fetchone()[0] or 0
         return data
     except Exception as e:
-        print(f"Error in get_analytics_data: {e}")
+        logger.error(f"Failed to compute analytics data: {str(e)}", exc_info=True)
         return {}
 
 # Credential Management Functions
 
-def set_drive_credentials(telegram_id, username, name, primary_email_address, email_address_1, email_address_2, email_address_3, credential_1, credential_2, credential_3, default_upload_location='root', parallel_uploads=1):
-    with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
+def set_drive_credentials(telegram_id, username, name, primary_email_address, email_address_1, email_address_2, email_address_3, credential_1, credential_2, credential_3, default_upload_location=None, parallel_uploads=None):
+    # UPSERT updates the existing row in place instead of INSERT OR REPLACE's delete+insert;
+    # settings that are not passed keep their stored value (or the column default for a new row)
+    with _get_conn() as conn:
         cursor = conn.cursor()
-        cursor.execute("INSERT OR REPLACE INTO user_credentials (telegram_id, username, name, primary_email_address, email_address_1, email_address_2, email_address_3, credential_1, credential_2, credential_3, default_upload_location, parallel_uploads, last_updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
-            (telegram_id, username, name, primary_email_address, email_address_1, email_address_2, email_address_3, credential_1, credential_2, credential_3, default_upload_location, parallel_uploads))
+        cursor.execute(SQL_UPSERT_DRIVE_CREDENTIALS,
+            (int(telegram_id), username, name, primary_email_address, email_address_1, email_address_2, email_address_3, credential_1, credential_2, credential_3, default_upload_location, parallel_uploads))
+    _invalidate_user_credentials(telegram_id)
+
+@functools.lru_cache(maxsize=512)
+def _decrypt_credential(cred_blob):
+    # Keyed on the ciphertext itself, so a re-auth (new blob) is a new entry and
+    # stale plaintext is never returned. Callers get a fresh dict from json.loads.
+    return CIPHER.decrypt(cred_blob.encode()).decode()
 
 def get_drive_credentials(telegram_id, account_email=None):
     if not account_email:
         return None
-    with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
+    with _get_conn() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT email_address_1, email_address_2, email_address_3, credential_1, credential_2, credential_3 FROM user_credentials WHERE telegram_id = ?", (str(telegram_id),))
+        cursor.execute("SELECT email_address_1, email_address_2, email_address_3, credential_1, credential_2, credential_3 FROM user_credentials WHERE telegram_id = ?", (int(telegram_id),))
         row = cursor.fetchone()
     if not row:
         return None
@@ -1246,33 +1940,22 @@ def get_drive_credentials(telegram_id, account_email=None):
     if not cred_blob:
         return None
     try:
-        decrypted = CIPHER.decrypt(cred_blob.encode()).decode()
-        creds_dict = json.loads(decrypted)
-        return creds_dict
+        return json.loads(_decrypt_credential(cred_blob))
     except Exception:
         return None
 
 def remove_drive_credentials(telegram_id, account_email):
-    with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
+    with _get_conn() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT email_address_1, email_address_2, email_address_3 FROM user_credentials WHERE telegram_id = ?", (str(telegram_id),))
+        cursor.execute("SELECT email_address_1, email_address_2, email_address_3 FROM user_credentials WHERE telegram_id = ?", (int(telegram_id),))
         row = cursor.fetchone()
-    if not row:
+    if not row or not account_email or account_email not in row:
         return False
-    email_1, email_2, email_3 = row
-    field, email_field = None, None
-    if account_email == email_1:
-        field, email_field = 'credential_1', 'email_address_1'
-    elif account_email == email_2:
-        field, email_field = 'credential_2', 'email_address_2'
-    elif account_email == email_3:
-        field, email_field = 'credential_3', 'email_address_3'
-    else:
-        return False
-    with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
+    slot = row.index(account_email) + 1
+    with _get_conn() as conn:
         cursor = conn.cursor()
-        cursor.execute(f"UPDATE user_credentials SET {field} = NULL, {email_field} = NULL, last_updated = CURRENT_TIMESTAMP WHERE telegram_id = ?", (str(telegram_id),))
-        conn.commit()
+        cursor.execute(SQL_REMOVE_DRIVE_CREDENTIAL[slot], (int(telegram_id),))
+    _invalidate_user_credentials(telegram_id)
     return True
 
 def get_known_user_username(user_id):
@@ -1280,116 +1963,72 @@ def get_known_user_username(user_id):
     Retrieve the username for a given user_id from the cloudverse_users table.
     Returns the username as a string, or None if not found.
     """
-    import sqlite3
-    from .config import DB_PATH
-    conn = sqlite3.connect(str(DB_PATH))
-    cursor = conn.cursor()
-    cursor.execute("SELECT username FROM administrators WHERE telegram_id = ?", (str(user_id),))
-    row = cursor.fetchone()
-    conn.close()
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_GET_ADMIN_USERNAME, (int(user_id),))
+        row = cursor.fetchone()
     if row and row[0]:
         return row[0]
     return None
 
 # Quota Management Functions
 
-def get_user_quota_info(telegram_id, username=None):
+def _quota_username(telegram_id, username=None):
+    """Username recorded on a new quota row: the caller's, else the whitelist's."""
+    if username is None:
+        cached, role = _lookup_username(telegram_id)
+        if role == 'whitelist':
+            username = cached
+    return username
+
+@_db_call(default=lambda: {
+    'daily_limit': 5,
+    'daily_used': 0,
+    'current_date': datetime.now().strftime("%Y-%m-%d"),
+    'last_reset_time': datetime.now().isoformat()
+})
+def get_user_quota_info(cursor, telegram_id, username=None):
     """Get user's current quota information"""
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            cursor = conn.cursor()
-            current_date = datetime.now().strftime("%Y-%m-%d")
-            
-            # Get or create user quota record
-            cursor.execute("SELECT * FROM user_quota WHERE telegram_id = ?", (str(telegram_id),))
-            quota_record = cursor.fetchone()
-            
-            if not quota_record:
-                # Get username if not provided
-                if not username:
-                    # Try to get username from whitelisted_users table
-                    cursor.execute("SELECT username FROM whitelisted_users WHERE telegram_id = ?", (str(telegram_id),))
-                    user_record = cursor.fetchone()
-                    username = user_record[0] if user_record else None
-                
-                # Create new quota record for user
-                cursor.execute("""
-                    INSERT INTO user_quota (telegram_id, username, daily_upload_limit, current_date, daily_uploads_used, last_reset_time)
-                    VALUES (?, ?, 5, ?, 0, CURRENT_TIMESTAMP)
-                """, (str(telegram_id), username, current_date))
-                conn.commit()
-                return {
-                    'daily_limit': 5,
-                    'daily_used': 0,
-                    'current_date': current_date,
-                    'last_reset_time': datetime.now().isoformat()
-                }
-            
-            # Check if we need to reset daily quota (new day)
-            stored_date = quota_record[3]  # current_date column
-            if stored_date != current_date:
-                # Reset daily quota for new day
-                cursor.execute("""
-                    UPDATE user_quota 
-                    SET current_date = ?, daily_uploads_used = 0, last_reset_time = CURRENT_TIMESTAMP, last_updated = CURRENT_TIMESTAMP
-                    WHERE telegram_id = ?
-                """, (current_date, str(telegram_id)))
-                conn.commit()
-                return {
-                    'daily_limit': quota_record[2],  # daily_upload_limit
-                    'daily_used': 0,
-                    'current_date': current_date,
-                    'last_reset_time': datetime.now().isoformat()
-                }
-            
-            return {
-                'daily_limit': quota_record[2],  # daily_upload_limit
-                'daily_used': quota_record[4],   # daily_uploads_used
-                'current_date': quota_record[3], # current_date
-                'last_reset_time': quota_record[5] # last_reset_time
-            }
-    except Exception as e:
-        print(f"Error in get_user_quota_info: {e}")
+    telegram_id = int(telegram_id)
+    # Admins have unlimited quota (a limit of 0); no quota row is read or created for them
+    if is_admin(telegram_id):
         return {
-            'daily_limit': 5,
+            'daily_limit': 0,
             'daily_used': 0,
             'current_date': datetime.now().strftime("%Y-%m-%d"),
-            'last_reset_time': datetime.now().isoformat()
+            'last_reset_time': None
         }
-
-def increment_user_quota(telegram_id):
+    # Creates the record on first use and resets the counter on a new day,
+    # returning the up-to-date values in the same statement
+    cursor.execute(SQL_UPSERT_USER_QUOTA, (telegram_id, _quota_username(telegram_id, username), 0))
+    daily_limit, daily_used, quota_date, last_reset_time = cursor.fetchone()
+    return {
+        'daily_limit': daily_limit,
+        'daily_used': daily_used,
+        'current_date': quota_date,
+        'last_reset_time': last_reset_time
+    }
+
+@_db_call(default=False)
+def increment_user_quota(cursor, telegram_id):
     """Increment user's daily upload count"""
-    try:
-        # Don't increment quota for admins (both super admins and regular admins)
-        if is_admin(telegram_id):
-            return True
-        
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            cursor = conn.cursor()
-            current_date = datetime.now().strftime("%Y-%m-%d")
-            
-            # Get current quota info
-            quota_info = get_user_quota_info(telegram_id)
-            
-            # Increment the daily uploads used
-            cursor.execute("""
-                UPDATE user_quota 
-                SET daily_uploads_used = daily_uploads_used + 1, last_updated = CURRENT_TIMESTAMP
-                WHERE telegram_id = ? AND current_date = ?
-            """, (str(telegram_id), current_date))
-            conn.commit()
-            return True
-    except Exception as e:
-        print(f"Error in increment_user_quota: {e}")
-        return False
+    telegram_id = int(telegram_id)
+    # Don't increment quota for admins (both super admins and regular admins)
+    if is_admin(telegram_id):
+        return True
+    
+    username = _quota_username(telegram_id)
+    # Take the write lock up front so the increment never waits on a lock upgrade
+    cursor.execute("BEGIN IMMEDIATE")
+    # Same upsert as get_user_quota_info, counting this upload in the same step
+    cursor.execute(SQL_UPSERT_USER_QUOTA, (telegram_id, username, 1))
+    cursor.fetchone()
+    return True
 
 def check_user_quota_limit(telegram_id):
     """Check if user has exceeded their daily quota limit"""
     try:
-        # Admins have unlimited quota
-        if is_admin(telegram_id):
-            return True
-        
+        # Admins get an unlimited quota from get_user_quota_info without a database round-trip
         quota_info = get_user_quota_info(telegram_id)
         # If daily_limit is 0, it means unlimited
         if quota_info['daily_limit'] == 0:
@@ -1397,31 +2036,17 @@ def check_user_quota_limit(telegram_id):
         
         return quota_info['daily_used'] < quota_info['daily_limit']
     except Exception as e:
-        print(f"Error in check_user_quota_limit: {e}")
+        logger.error(f"Failed to check quota limit for {telegram_id}: {str(e)}", exc_info=True)
         return False
 
-def set_user_quota_limit(telegram_id, daily_limit):
+@_db_call(default=False)
+def set_user_quota_limit(cursor, telegram_id, daily_limit):
     """Set custom daily quota limit for a user"""
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            cursor = conn.cursor()
-            current_date = datetime.now().strftime("%Y-%m-%d")
-            
-            # Get username from whitelisted_users table
-            cursor.execute("SELECT username FROM whitelisted_users WHERE telegram_id = ?", (str(telegram_id),))
-            user_record = cursor.fetchone()
-            username = user_record[0] if user_record else None
-            
-            cursor.execute("""
-                INSERT OR REPLACE INTO user_quota 
-                (telegram_id, username, daily_upload_limit, current_date, daily_uploads_used, last_reset_time, last_updated)
-                VALUES (?, ?, ?, ?, COALESCE((SELECT daily_uploads_used FROM user_quota WHERE telegram_id = ?), 0), CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            """, (str(telegram_id), username, daily_limit, current_date, str(telegram_id)))
-            conn.commit()
-            return True
-    except Exception as e:
-        print(f"Error in set_user_quota_limit: {e}")
-        return False
+    telegram_id = int(telegram_id)
+    username = _quota_username(telegram_id)
+    
+    cursor.execute(SQL_SET_USER_QUOTA_LIMIT, (telegram_id, username, daily_limit))
+    return True
 
 # ============================================================================
 # PENDING USERS MANAGEMENT - Functions for handling access requests
@@ -1452,30 +2077,37 @@ def add_pending_user(telegram_id, username=None, first_name=None, last_name=None
     """
     logger.info(f"Adding pending user: telegram_id={telegram_id}, username={username}")
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT OR IGNORE INTO pending_users 
-                    (telegram_id, username, first_name, last_name, group_message_id, requested_at)
-                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """, (str(telegram_id), username, first_name, last_name, group_message_id))
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_ADD_PENDING, (int(telegram_id), username, first_name, last_name, group_message_id))
+            _invalidate_analytics()
                 
-                # Log the pending request
-                log_cloudverse_history_event(
-                    telegram_id=str(telegram_id),
-                    username=username,
-                    user_role="pending",
-                    action_taken="access_request",
-                    status="pending",
-                    event_details=f"User requested access: {username or telegram_id}"
-                )
-                logger.info(f"Successfully added pending user: {username or telegram_id}")
-                return True
+        # Log the pending request once the insert has committed
+        log_cloudverse_history_event(
+            telegram_id=telegram_id,
+            username=username,
+            user_role="pending",
+            action_taken="access_request",
+            status="pending",
+            event_details=f"User requested access: {username or telegram_id}"
+        )
+        logger.info(f"Successfully added pending user: {username or telegram_id}")
+        return True
     except Exception as e:
         logger.error(f"Failed to add pending user {telegram_id}: {str(e)}", exc_info=True)
         return False
 
+def iter_pending_users():
+    # Streaming counterpart of get_pending_users; see iter_cloudverse_history_events
+    cursor = _get_conn().cursor()
+    cursor.row_factory = sqlite3.Row
+    try:
+        cursor.execute(SQL_GET_PENDING_USERS)
+        for row in cursor:
+            yield dict(row)
+    finally:
+        cursor.close()
+
 def get_pending_users():
     """
     Retrieve all users awaiting access approval.
@@ -1497,31 +2129,12 @@ def get_pending_users():
     """
     logger.debug("Retrieving all pending users")
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT telegram_id, username, first_name, last_name, group_message_id, requested_at
-                FROM pending_users
-                ORDER BY requested_at ASC
-            """)
-            rows = cursor.fetchall()
-            
-            pending_users = []
-            for row in rows:
-                pending_users.append({
-                    'telegram_id': row[0],
-                    'username': row[1],
-                    'first_name': row[2],
-                    'last_name': row[3],
-                    'group_message_id': row[4],
-                    'requested_at': row[5]
-                })
-            
-            logger.debug(f"Retrieved {len(pending_users)} pending users")
-            return pending_users
+        pending_users = list(iter_pending_users())
     except Exception as e:
         logger.error(f"Failed to retrieve pending users: {str(e)}", exc_info=True)
         return []
+    logger.debug("Retrieved %s pending users", len(pending_users))
+    return pending_users
 
 def remove_pending_user(telegram_id, processed_by=None):
     """
@@ -1544,35 +2157,33 @@ def remove_pending_user(telegram_id, processed_by=None):
     """
     logger.info(f"Removing pending user: {telegram_id}, processed_by: {processed_by}")
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                
-                # Get user info before deletion for logging
-                cursor.execute("SELECT username FROM pending_users WHERE telegram_id = ?", (str(telegram_id),))
-                user_record = cursor.fetchone()
-                username = user_record[0] if user_record else None
+        with _get_conn() as conn:
+            cursor = conn.cursor()
                 
-                # Remove from pending list
-                cursor.execute("DELETE FROM pending_users WHERE telegram_id = ?", (str(telegram_id),))
+            # Remove from pending list, fetching the username for logging in the same statement
+            cursor.execute(SQL_REMOVE_PENDING, (int(telegram_id),))
+            user_record = cursor.fetchone()
+            username = user_record[0] if user_record else None
+            _invalidate_analytics()
                 
-                # Log the processing action
-                log_cloudverse_history_event(
-                    telegram_id=str(telegram_id),
-                    username=username,
-                    user_role="pending",
-                    action_taken="request_processed",
-                    status="completed",
-                    handled_by=processed_by,
-                    event_details=f"Pending request processed for: {username or telegram_id}"
-                )
-                logger.info(f"Successfully removed pending user: {username or telegram_id}")
-                return True
+        # Log the processing action once the delete has committed
+        log_cloudverse_history_event(
+            telegram_id=telegram_id,
+            username=username,
+            user_role="pending",
+            action_taken="request_processed",
+            status="completed",
+            handled_by=processed_by,
+            event_details=f"Pending request processed for: {username or telegram_id}"
+        )
+        logger.info(f"Successfully removed pending user: {username or telegram_id}")
+        return True
     except Exception as e:
         logger.error(f"Failed to remove pending user {telegram_id}: {str(e)}", exc_info=True)
         return False
 
-def update_pending_user_group_message(telegram_id, group_message_id):
+@_db_call(default=False)
+def update_pending_user_group_message(cursor, telegram_id, group_message_id):
     """
     Update the group message ID for a pending user request.
     
@@ -1587,23 +2198,13 @@ def update_pending_user_group_message(telegram_id, group_message_id):
     Returns:
         bool: True if updated successfully, False otherwise
     """
-    logger.debug(f"Updating group message ID for pending user {telegram_id}: {group_message_id}")
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE pending_users 
-                    SET group_message_id = ?
-                    WHERE telegram_id = ?
-                """, (group_message_id, str(telegram_id)))
-                logger.debug(f"Updated group message ID for user {telegram_id}")
-                return True
-    except Exception as e:
-        logger.error(f"Failed to update group message ID for user {telegram_id}: {str(e)}", exc_info=True)
-        return False
+    logger.debug("Updating group message ID for pending user %s: %s", telegram_id, group_message_id)
+    cursor.execute(SQL_SET_PENDING_GROUP_MESSAGE, (group_message_id, int(telegram_id)))
+    logger.debug("Updated group message ID for user %s", telegram_id)
+    return True
 
-def get_pending_user_group_message(telegram_id):
+@_db_call(default=None)
+def get_pending_user_group_message(cursor, telegram_id):
     """
     Get the group message ID for a pending user request.
     
@@ -1613,17 +2214,12 @@ def get_pending_user_group_message(telegram_id):
     Returns:
         int: Group message ID if found, None otherwise
     """
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT group_message_id FROM pending_users WHERE telegram_id = ?", (str(telegram_id),))
-            result = cursor.fetchone()
-            return result[0] if result else None
-    except Exception as e:
-        logger.error(f"Failed to get group message ID for user {telegram_id}: {str(e)}", exc_info=True)
-        return None
+    cursor.execute(SQL_GET_PENDING_GROUP_MESSAGE, (int(telegram_id),))
+    result = cursor.fetchone()
+    return result[0] if result else None
 
-def clear_pending_user_group_message(telegram_id):
+@_db_call(default=False)
+def clear_pending_user_group_message(cursor, telegram_id):
     """
     Clear the group message ID for a pending user request.
     
@@ -1633,27 +2229,46 @@ def clear_pending_user_group_message(telegram_id):
     Returns:
         bool: True if cleared successfully, False otherwise
     """
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE pending_users 
-                    SET group_message_id = NULL
-                    WHERE telegram_id = ?
-                """, (str(telegram_id),))
-                return True
-    except Exception as e:
-        logger.error(f"Failed to clear group message ID for user {telegram_id}: {str(e)}", exc_info=True)
-        return False
+    cursor.execute(SQL_SET_PENDING_GROUP_MESSAGE, (None, int(telegram_id)))
+    return True
 
 # ============================================================================
 # UPLOAD MANAGEMENT - Functions for tracking file uploads and operations
 # ============================================================================
 
+# Upload records are written behind the caller, like history events: uploads
+# arrive in bursts, and one transaction per UPLOAD_BATCH_SIZE rows (or per
+# UPLOAD_FLUSH_INTERVAL) replaces one commit per row.
+UPLOAD_BATCH_SIZE = 50
+UPLOAD_FLUSH_INTERVAL = 0.1
+
+def _write_upload_batch(conn, rows):
+    """Insert a batch of queued upload rows in a single transaction."""
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(SQL_INSERT_QUEUED_UPLOAD, rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        _invalidate_analytics()
+        logger.info(f"Successfully recorded {len(rows)} queued uploads")
+    except Exception as e:
+        logger.error(f"Failed to record {len(rows)} queued uploads: {str(e)}", exc_info=True)
+
+_upload_writer = _BatchWriter("upload-writer", _write_upload_batch, UPLOAD_BATCH_SIZE, UPLOAD_FLUSH_INTERVAL)
+
+def flush_uploads(timeout=5.0):
+    """Write out any queued upload records and stop the writer thread (called at exit)."""
+    _upload_writer.flush(timeout)
+
+atexit.register(flush_uploads)
+
 def insert_upload(telegram_id, file_id=None, file_name=None, file_size=None, file_type=None, 
                  message_id=None, chat_id=None, status='pending', error_message=None, 
-                 upload_method=None, average_speed=None, upload_source=None, upload_duration=None):
+                 upload_method=None, average_speed=None, upload_source=None, upload_duration=None,
+                 username=None):
     """
     Record a file upload attempt in the database.
     
@@ -1675,52 +2290,64 @@ def insert_upload(telegram_id, file_id=None, file_name=None, file_size=None, fil
         average_speed (float): Upload speed in bytes/second (optional)
         upload_source (str): Source of the upload ('telegram', 'url', 'api') (optional)
         upload_duration (float): Time taken for upload in seconds (optional)
+        username (str): Uploader's Telegram username, stored on the record
+            as given (optional)
         
     Returns:
-        int: Upload record ID if successful, None otherwise
+        None. The record is queued and written by the upload writer thread,
+        so no record ID is available to the caller.
         
     Database Impact:
-        - Inserts new record into uploads table
-        - Auto-generates unique ID for tracking
-        - Records timestamp for analytics
+        - Queues a record for the uploads table; the writer thread inserts
+          queued uploads in batches, one transaction per batch
+        - uploaded_at is taken when the upload is queued (UTC, same format as
+          CURRENT_TIMESTAMP)
+        - Username is recorded as passed by the caller; when omitted it is
+          taken from the whitelist, then administrators (cached per user, see
+          _lookup_username)
     """
     logger.info(f"Recording upload: user={telegram_id}, file={file_name}, status={status}")
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                
-                # Get username for the record
-                username = None
-                cursor.execute("SELECT username FROM whitelisted_users WHERE telegram_id = ?", (str(telegram_id),))
-                user_record = cursor.fetchone()
-                if user_record:
-                    username = user_record[0]
-                else:
-                    # Try administrators table
-                    cursor.execute("SELECT username FROM administrators WHERE telegram_id = ?", (str(telegram_id),))
-                    admin_record = cursor.fetchone()
-                    if admin_record:
-                        username = admin_record[0]
-                
-                cursor.execute("""
-                    INSERT INTO uploads 
-                    (telegram_id, username, chat_id, message_id, file_name, file_type, file_size, 
-                     status, error_message, upload_method, average_speed, upload_source, 
-                     upload_duration, uploaded_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """, (str(telegram_id), username, chat_id, message_id, file_name, file_type, 
-                      file_size, status, error_message, upload_method, average_speed, 
-                      upload_source, upload_duration))
-                
-                upload_id = cursor.lastrowid
-                logger.info(f"Successfully recorded upload with ID: {upload_id}")
-                return upload_id
+        uploaded_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        if username is None:
+            username, _ = _lookup_username(telegram_id)
+        _upload_writer.put((int(telegram_id), username, chat_id, message_id, file_name, file_type,
+                            file_size, status, error_message, upload_method, average_speed,
+                            upload_source, upload_duration, uploaded_at, file_id))
     except Exception as e:
         logger.error(f"Failed to record upload for user {telegram_id}: {str(e)}", exc_info=True)
-        return None
+    return None
+
+def insert_uploads_many(rows):
+    """
+    Record many upload rows in one transaction.
+
+    Args:
+        rows: iterable of (telegram_id, username, chat_id, message_id, file_name,
+            file_type, file_size, status, error_message, upload_method,
+            average_speed, upload_source, upload_duration) tuples, in the same
+            order as insert_upload's insert
+
+    Returns:
+        int: number of upload records written
+    """
+    rows = [(int(row[0]),) + tuple(row[1:]) for row in rows]
+    logger.info(f"Recording {len(rows)} uploads in bulk")
+    if not rows:
+        return 0
+    try:
+        with _write_lock, _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(SQL_INSERT_UPLOAD, rows)
+            _invalidate_analytics()
+        logger.info(f"Successfully recorded {len(rows)} uploads in bulk")
+        return len(rows)
+    except Exception as e:
+        logger.error(f"Failed to record uploads in bulk: {str(e)}", exc_info=True)
+        raise
 
-def get_upload_by_file_id(file_id):
+@_db_call(default=None)
+def get_upload_by_file_id(cursor, file_id):
     """
     Retrieve upload record by Telegram file ID.
     
@@ -1743,49 +2370,33 @@ def get_upload_by_file_id(file_id):
         - uploaded_at: Upload timestamp
         - (and other upload fields)
     """
-    logger.debug(f"Retrieving upload record for file_id: {file_id}")
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, telegram_id, username, chat_id, message_id, file_name, file_type, 
-                       file_size, status, error_message, upload_method, average_speed, 
-                       upload_source, upload_duration, uploaded_at
-                FROM uploads 
-                WHERE message_id = ? OR file_name LIKE ?
-                ORDER BY uploaded_at DESC
-                LIMIT 1
-            """, (file_id, f"%{file_id}%"))
-            
-            row = cursor.fetchone()
-            if row:
-                upload_record = {
-                    'id': row[0],
-                    'telegram_id': row[1],
-                    'username': row[2],
-                    'chat_id': row[3],
-                    'message_id': row[4],
-                    'file_name': row[5],
-                    'file_type': row[6],
-                    'file_size': row[7],
-                    'status': row[8],
-                    'error_message': row[9],
-                    'upload_method': row[10],
-                    'average_speed': row[11],
-                    'upload_source': row[12],
-                    'upload_duration': row[13],
-                    'uploaded_at': row[14]
-                }
-                logger.debug(f"Found upload record: {upload_record['id']}")
-                return upload_record
-            else:
-                logger.debug(f"No upload record found for file_id: {file_id}")
-                return None
-    except Exception as e:
-        logger.error(f"Failed to retrieve upload record for file_id {file_id}: {str(e)}", exc_info=True)
+    logger.debug("Retrieving upload record for file_id: %s", file_id)
+    cursor.row_factory = sqlite3.Row
+    cursor.execute(SQL_GET_UPLOAD_BY_FILE_ID, (file_id,))
+
+    row = cursor.fetchone()
+    if row:
+        upload_record = dict(row)
+        logger.debug("Found upload record: %s", upload_record['id'])
+        return upload_record
+    else:
+        logger.debug("No upload record found for file_id: %s", file_id)
         return None
 
-def get_user_upload_stats(telegram_id, days=30):
+@_db_call(default=lambda: {
+    'total_uploads': 0,
+    'successful_uploads': 0,
+    'failed_uploads': 0,
+    'success_rate': 0,
+    'total_bandwidth': 0,
+    'average_file_size': 0,
+    'most_common_file_type': None,
+    'upload_activity_by_day': [],
+    'average_upload_speed': 0,
+    'first_upload': None,
+    'last_upload': None
+})
+def get_user_upload_stats(cursor, telegram_id, days=30):
     """
     Get comprehensive upload statistics for a specific user.
     
@@ -1809,103 +2420,41 @@ def get_user_upload_stats(telegram_id, days=30):
         - most_common_file_type: Most frequently uploaded file type
         - upload_activity_by_day: Daily upload counts
         - average_upload_speed: Average upload speed
+        - first_upload / last_upload: Earliest and latest upload timestamps
     """
-    logger.debug(f"Getting upload stats for user {telegram_id} (last {days} days)")
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            cursor = conn.cursor()
-            
-            # Calculate date range
-            date_filter = f"uploaded_at >= DATE('now', '-{days} days')"
-            
-            stats = {}
-            
-            # Total uploads
-            cursor.execute(f"""
-                SELECT COUNT(*) FROM uploads 
-                WHERE telegram_id = ? AND {date_filter}
-            """, (str(telegram_id),))
-            stats['total_uploads'] = cursor.fetchone()[0]
-            
-            # Successful uploads
-            cursor.execute(f"""
-                SELECT COUNT(*) FROM uploads 
-                WHERE telegram_id = ? AND status = 'success' AND {date_filter}
-            """, (str(telegram_id),))
-            stats['successful_uploads'] = cursor.fetchone()[0]
-            
-            # Failed uploads
-            cursor.execute(f"""
-                SELECT COUNT(*) FROM uploads 
-                WHERE telegram_id = ? AND status = 'failed' AND {date_filter}
-            """, (str(telegram_id),))
-            stats['failed_uploads'] = cursor.fetchone()[0]
-            
-            # Success rate
-            if stats['total_uploads'] > 0:
-                stats['success_rate'] = (stats['successful_uploads'] / stats['total_uploads']) * 100
-            else:
-                stats['success_rate'] = 0
-            
-            # Total bandwidth (successful uploads only)
-            cursor.execute(f"""
-                SELECT COALESCE(SUM(file_size), 0) FROM uploads 
-                WHERE telegram_id = ? AND status = 'success' AND {date_filter}
-            """, (str(telegram_id),))
-            stats['total_bandwidth'] = cursor.fetchone()[0]
-            
-            # Average file size
-            cursor.execute(f"""
-                SELECT COALESCE(AVG(file_size), 0) FROM uploads 
-                WHERE telegram_id = ? AND status = 'success' AND file_size IS NOT NULL AND {date_filter}
-            """, (str(telegram_id),))
-            stats['average_file_size'] = cursor.fetchone()[0]
-            
-            # Most common file type
-            cursor.execute(f"""
-                SELECT file_type, COUNT(*) as count FROM uploads 
-                WHERE telegram_id = ? AND file_type IS NOT NULL AND {date_filter}
-                GROUP BY file_type 
-                ORDER BY count DESC 
-                LIMIT 1
-            """, (str(telegram_id),))
-            file_type_result = cursor.fetchone()
-            stats['most_common_file_type'] = file_type_result[0] if file_type_result else None
-            
-            # Upload activity by day
-            cursor.execute(f"""
-                SELECT DATE(uploaded_at) as upload_date, COUNT(*) as count 
-                FROM uploads 
-                WHERE telegram_id = ? AND {date_filter}
-                GROUP BY DATE(uploaded_at) 
-                ORDER BY upload_date DESC
-            """, (str(telegram_id),))
-            stats['upload_activity_by_day'] = cursor.fetchall()
-            
-            # Average upload speed
-            cursor.execute(f"""
-                SELECT COALESCE(AVG(average_speed), 0) FROM uploads 
-                WHERE telegram_id = ? AND average_speed IS NOT NULL AND {date_filter}
-            """, (str(telegram_id),))
-            stats['average_upload_speed'] = cursor.fetchone()[0]
-            
-            logger.debug(f"Retrieved upload stats for user {telegram_id}: {stats['total_uploads']} uploads")
-            return stats
-    except Exception as e:
-        logger.error(f"Failed to get upload stats for user {telegram_id}: {str(e)}", exc_info=True)
-        return {
-            'total_uploads': 0,
-            'successful_uploads': 0,
-            'failed_uploads': 0,
-            'success_rate': 0,
-            'total_bandwidth': 0,
-            'average_file_size': 0,
-            'most_common_file_type': None,
-            'upload_activity_by_day': [],
-            'average_upload_speed': 0
-        }
+    logger.debug("Getting upload stats for user %s (last %s days)", telegram_id, days)
+
+    # Window start is bound as a DATE() modifier so every `days` value reuses the same statements
+    params = (int(telegram_id), f"-{int(days)} days")
 
-def update_upload_status(upload_id, status, error_message=None, average_speed=None, upload_duration=None):
+    stats = {}
+
+    # Counts, bandwidth, averages and first/last upload in one pass over the user's rows
+    cursor.execute(SQL_USER_UPLOAD_TOTALS, params)
+    (stats['total_uploads'], stats['successful_uploads'], stats['failed_uploads'],
+     stats['total_bandwidth'], stats['average_file_size'], stats['average_upload_speed'],
+     stats['first_upload'], stats['last_upload']) = cursor.fetchone()
+
+    # Success rate
+    if stats['total_uploads'] > 0:
+        stats['success_rate'] = (stats['successful_uploads'] / stats['total_uploads']) * 100
+    else:
+        stats['success_rate'] = 0
+
+    # Most common file type
+    cursor.execute(SQL_USER_TOP_FILE_TYPE, params)
+    file_type_result = cursor.fetchone()
+    stats['most_common_file_type'] = file_type_result[0] if file_type_result else None
+
+    # Upload activity by day
+    cursor.execute(SQL_USER_UPLOADS_BY_DAY, params)
+    stats['upload_activity_by_day'] = cursor.fetchall()
+
+    logger.debug("Retrieved upload stats for user %s: %s uploads", telegram_id, stats['total_uploads'])
+    return stats
+
+@_db_call(default=False, write=True)
+def update_upload_status(cursor, upload_id, status, error_message=None, average_speed=None, upload_duration=None):
     """
     Update the status and metrics of an existing upload record.
     
@@ -1922,27 +2471,56 @@ def update_upload_status(upload_id, status, error_message=None, average_speed=No
     Returns:
         bool: True if updated successfully, False otherwise
     """
-    logger.debug(f"Updating upload {upload_id} status to: {status}")
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE uploads 
-                    SET status = ?, error_message = ?, average_speed = ?, upload_duration = ?
-                    WHERE id = ?
-                """, (status, error_message, average_speed, upload_duration, upload_id))
-                
-                logger.debug(f"Successfully updated upload {upload_id}")
-                return True
-    except Exception as e:
-        logger.error(f"Failed to update upload {upload_id}: {str(e)}", exc_info=True)
-        return False
+    logger.debug("Updating upload %s status to: %s", upload_id, status)
+    cursor.execute(SQL_UPDATE_UPLOAD_STATUS, (status, error_message, average_speed, upload_duration, upload_id))
+
+    logger.debug("Successfully updated upload %s", upload_id)
+    return True
 
 # ============================================================================
 # HISTORY AND AUDIT LOGGING - Functions for tracking system events
 # ============================================================================
 
+# History rows are written by a background thread so callers never wait on
+# (or contend with) the audit log write. Events are batched: the writer takes
+# everything queued within HISTORY_FLUSH_INTERVAL, up to HISTORY_BATCH_SIZE
+# rows, and inserts them in one transaction. The queue is bounded so a stalled
+# writer can never back up into the bot's handlers; overflow is dropped.
+HISTORY_BATCH_SIZE = 100
+HISTORY_FLUSH_INTERVAL = 0.05
+HISTORY_QUEUE_SIZE = 10000
+
+SQL_INSERT_HISTORY = """
+    INSERT INTO cloudverse_history 
+    (telegram_id, username, user_role, action_taken, status, handled_by, 
+     related_message_id, event_details, notes, event_time)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def _write_history_batch(conn, rows):
+    """Insert a batch of queued history rows in a single transaction."""
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(SQL_INSERT_HISTORY, rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.debug("Wrote %s history events", len(rows))
+    except Exception as e:
+        logger.error(f"Failed to write {len(rows)} history events: {str(e)}", exc_info=True)
+
+
+_history_writer = _BatchWriter("history-writer", _write_history_batch, HISTORY_BATCH_SIZE, HISTORY_FLUSH_INTERVAL,
+                               maxsize=HISTORY_QUEUE_SIZE)
+
+def flush_history_events(timeout=5.0):
+    """Write out any queued history events and stop the writer thread (called at exit)."""
+    _history_writer.flush(timeout)
+
+atexit.register(flush_history_events)
+
 def log_cloudverse_history_event(telegram_id, username=None, user_role=None, action_taken=None, 
                                 status=None, handled_by=None, related_message_id=None, 
                                 event_details=None, notes=None):
@@ -1965,7 +2543,8 @@ def log_cloudverse_history_event(telegram_id, username=None, user_role=None, act
         notes (str): Additional notes or comments (optional)
         
     Returns:
-        int: History record ID if successful, None otherwise
+        None. The event is queued and written by the history writer thread,
+        so no record ID is available to the caller.
         
     Common Action Types:
         - admin_promotion, admin_removal
@@ -1977,29 +2556,62 @@ def log_cloudverse_history_event(telegram_id, username=None, user_role=None, act
         - permission_change, quota_change
         
     Database Impact:
-        - Inserts new record into cloudverse_history table
-        - Auto-generates unique ID and timestamp
+        - Queues a record for the cloudverse_history table; the writer thread
+          inserts queued events in batches, one transaction per batch
+        - event_time is taken when the event is queued (UTC, same format as
+          CURRENT_TIMESTAMP)
         - Provides complete audit trail for compliance
     """
-    logger.debug(f"Logging history event: user={telegram_id}, action={action_taken}, status={status}")
+    logger.debug("Logging history event: user=%s, action=%s, status=%s", telegram_id, action_taken, status)
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO cloudverse_history 
-                    (telegram_id, username, user_role, action_taken, status, handled_by, 
-                     related_message_id, event_details, notes, event_time)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """, (str(telegram_id), username, user_role, action_taken, status, 
-                      handled_by, related_message_id, event_details, notes))
-                
-                history_id = cursor.lastrowid
-                logger.debug(f"Successfully logged history event with ID: {history_id}")
-                return history_id
+        event_time = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        _history_writer.put((int(telegram_id), username, _USER_ROLE_CODES.get(user_role, user_role), action_taken,
+                             _HISTORY_STATUS_CODES.get(status, status), handled_by, related_message_id,
+                             event_details, notes, event_time))
     except Exception as e:
         logger.error(f"Failed to log history event for user {telegram_id}: {str(e)}", exc_info=True)
-        return None
+    return None
+
+def log_cloudverse_history_events_many(events):
+    """
+    Queue many history events at once.
+
+    All events share one event_time and reach the writer thread together, so
+    they are normally written in a single transaction.
+
+    Args:
+        events: iterable of dicts using log_cloudverse_history_event's keyword
+            arguments (telegram_id is required, the rest are optional)
+
+    Returns:
+        int: number of events queued
+    """
+    event_time = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    queued = 0
+    try:
+        queued = _history_writer.put_many(
+            (int(event['telegram_id']), event.get('username'),
+             _USER_ROLE_CODES.get(event.get('user_role'), event.get('user_role')),
+             event.get('action_taken'),
+             _HISTORY_STATUS_CODES.get(event.get('status'), event.get('status')), event.get('handled_by'),
+             event.get('related_message_id'), event.get('event_details'),
+             event.get('notes'), event_time)
+            for event in events)
+    except Exception as e:
+        logger.error(f"Failed to log history events in bulk: {str(e)}", exc_info=True)
+    logger.debug("Queued %s history events", queued)
+    return queued
+
+def iter_user_history(telegram_id, limit=50):
+    # Streaming counterpart of get_user_history; see iter_cloudverse_history_events
+    cursor = _get_conn().cursor()
+    cursor.row_factory = sqlite3.Row
+    try:
+        cursor.execute(SQL_GET_USER_HISTORY, (int(telegram_id), limit))
+        for row in cursor:
+            yield _history_event(row)
+    finally:
+        cursor.close()
 
 def get_user_history(telegram_id, limit=50):
     """
@@ -2012,38 +2624,11 @@ def get_user_history(telegram_id, limit=50):
     Returns:
         list: List of history event dictionaries
     """
-    logger.debug(f"Retrieving history for user {telegram_id} (limit: {limit})")
+    logger.debug("Retrieving history for user %s (limit: %s)", telegram_id, limit)
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, telegram_id, username, user_role, action_taken, status, 
-                       handled_by, related_message_id, event_details, notes, event_time
-                FROM cloudverse_history 
-                WHERE telegram_id = ?
-                ORDER BY event_time DESC
-                LIMIT ?
-            """, (str(telegram_id), limit))
-            
-            rows = cursor.fetchall()
-            history_events = []
-            for row in rows:
-                history_events.append({
-                    'id': row[0],
-                    'telegram_id': row[1],
-                    'username': row[2],
-                    'user_role': row[3],
-                    'action_taken': row[4],
-                    'status': row[5],
-                    'handled_by': row[6],
-                    'related_message_id': row[7],
-                    'event_details': row[8],
-                    'notes': row[9],
-                    'event_time': row[10]
-                })
-            
-            logger.debug(f"Retrieved {len(history_events)} history events for user {telegram_id}")
-            return history_events
+        history_events = list(iter_user_history(telegram_id, limit))
+        logger.debug("Retrieved %s history events for user %s", len(history_events), telegram_id)
+        return history_events
     except Exception as e:
         logger.error(f"Failed to retrieve history for user {telegram_id}: {str(e)}", exc_info=True)
         return []
@@ -2052,6 +2637,18 @@ def get_user_history(telegram_id, limit=50):
 # USER PROFILE AND CREDENTIALS - Functions for user account management
 # ============================================================================
 
+# Credential settings are read on nearly every upload and folder lookup but only
+# change on re-auth or a settings edit, so they are cached per user. Every write
+# to user_credentials goes through _invalidate_user_credentials.
+CREDENTIALS_CACHE_TTL = 300
+CREDENTIALS_CACHE_SIZE = 4096
+
+_user_cred_cache = _TTLCache(CREDENTIALS_CACHE_SIZE, CREDENTIALS_CACHE_TTL)
+_default_folder_cache = _TTLCache(CREDENTIALS_CACHE_SIZE, CREDENTIALS_CACHE_TTL)
+
+def _invalidate_user_credentials(telegram_id):
+    _drop_user_entries(int(telegram_id), _user_cred_cache, _default_folder_cache)
+
 def get_user_credentials(telegram_id):
     """
     Get user's Google Drive credentials information (without sensitive data).
@@ -2075,17 +2672,16 @@ def get_user_credentials(telegram_id):
         - parallel_uploads: Number of parallel uploads allowed
         - last_updated: Last update timestamp
     """
-    logger.debug(f"Getting credentials info for user {telegram_id}")
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
+    logger.debug("Getting credentials info for user %s", telegram_id)
+    telegram_id = int(telegram_id)
+    cached = _user_cred_cache.get(telegram_id)
+    if cached is not None:
+        return dict(cached) if cached else None
+    generation = _user_cache_generation
+    try:
+        with _get_conn() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT telegram_id, username, name, email_address_1, email_address_2, 
-                       email_address_3, primary_email_address, default_upload_location, 
-                       parallel_uploads, last_updated
-                FROM user_credentials 
-                WHERE telegram_id = ?
-            """, (str(telegram_id),))
+            cursor.execute(SQL_GET_USER_CREDENTIALS, (telegram_id,))
             
             row = cursor.fetchone()
             if row:
@@ -2102,61 +2698,93 @@ def get_user_credentials(telegram_id):
                     'parallel_uploads': row[8],
                     'last_updated': row[9]
                 }
-                logger.debug(f"Retrieved credentials info for user {telegram_id}")
-                return credentials_info
+                logger.debug("Retrieved credentials info for user %s", telegram_id)
+                _cache_user_entry(_user_cred_cache, telegram_id, credentials_info, generation)
+                return dict(credentials_info)
             else:
-                logger.debug(f"No credentials found for user {telegram_id}")
+                logger.debug("No credentials found for user %s", telegram_id)
+                # Cache the miss as an empty dict so repeat lookups skip the query too
+                _cache_user_entry(_user_cred_cache, telegram_id, {}, generation)
                 return None
     except Exception as e:
         logger.error(f"Failed to get credentials info for user {telegram_id}: {str(e)}", exc_info=True)
         return None
 
-def get_user_default_folder_id(telegram_id):
+def get_user_default_folder_id(telegram_id, account_email=None):
     """
     Get user's default upload folder ID.
     
     Args:
         telegram_id (str): User's Telegram ID
+        account_email (str): Only use the stored folder if it belongs to this
+            account (optional)
         
     Returns:
         str: Default folder ID ('root' if not set or user not found)
     """
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT default_upload_location FROM user_credentials WHERE telegram_id = ?", 
-                         (str(telegram_id),))
-            result = cursor.fetchone()
-            return result[0] if result and result[0] else 'root'
-    except Exception as e:
-        logger.error(f"Failed to get default folder for user {telegram_id}: {str(e)}", exc_info=True)
+    telegram_id = int(telegram_id)
+    row = _default_folder_cache.get(telegram_id)
+    if row is None:
+        generation = _user_cache_generation
+        try:
+            with _get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute(SQL_GET_DEFAULT_FOLDER, (telegram_id,))
+                row = cursor.fetchone() or (None, None)
+        except Exception as e:
+            logger.error(f"Failed to get default folder for user {telegram_id}: {str(e)}", exc_info=True)
+            return 'root'
+        _cache_user_entry(_default_folder_cache, telegram_id, row, generation)
+    email_address_1, default_upload_location = row
+    if account_email and account_email != email_address_1:
         return 'root'
+    return default_upload_location or 'root'
 
-def get_user_monthly_bandwidth(telegram_id):
+def set_user_default_folder_id(telegram_id, folder_id, account_email=None):
     """
-    Get user's bandwidth usage for the current month.
+    Set user's default upload folder ID.
     
     Args:
         telegram_id (str): User's Telegram ID
+        folder_id (str): Google Drive folder ID
+        account_email (str): Only update the row if it belongs to this account (optional)
         
     Returns:
-        int: Total bytes uploaded this month
+        bool: True if a row was updated
     """
-    try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT COALESCE(SUM(file_size), 0) 
-                FROM uploads 
-                WHERE telegram_id = ? 
-                AND status = 'success' 
-                AND uploaded_at >= DATE('now', 'start of month')
-            """, (str(telegram_id),))
-            result = cursor.fetchone()
-            return result[0] if result else 0
-    except Exception as e:
-        logger.error(f"Failed to get monthly bandwidth for user {telegram_id}: {str(e)}", exc_info=True)
-        return 0
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+        if account_email:
+            cursor.execute(SQL_SET_DEFAULT_FOLDER_FOR_ACCOUNT, (folder_id, int(telegram_id), account_email))
+        else:
+            cursor.execute(SQL_SET_DEFAULT_FOLDER, (folder_id, int(telegram_id)))
+        updated = cursor.rowcount > 0
+    _invalidate_user_credentials(telegram_id)
+    return updated
+
+def _month_range(year_month=None):
+    """
+    Return the half-open [first of month, first of next month) bounds for a
+    'YYYY-MM' month (default: current month) as uploaded_at-comparable strings,
+    so the raw column can be range-scanned through the uploads indexes.
+    """
+    month_start = datetime.strptime(year_month, "%Y-%m") if year_month else datetime.now().replace(day=1)
+    month_start = month_start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    return month_start.strftime('%Y-%m-%d %H:%M:%S'), next_month.strftime('%Y-%m-%d %H:%M:%S')
+
+def get_user_monthly_bandwidth(telegram_id, year_month=None):
+    """
+    Get user's bandwidth usage for a calendar month.
+    
+    Args:
+        telegram_id (str): User's Telegram ID
+        year_month (str): Month as 'YYYY-MM' (default: current month)
+        
+    Returns:
+        int: Total bytes uploaded in that month
+    """
+    return get_user_bandwidth_stats(telegram_id, year_month)[0]
 
 def get_user_total_bandwidth(telegram_id):
     """
@@ -2168,19 +2796,28 @@ def get_user_total_bandwidth(telegram_id):
     Returns:
         int: Total bytes uploaded (all time)
     """
+    return get_user_bandwidth_stats(telegram_id)[1]
+
+def get_user_bandwidth_stats(telegram_id, year_month=None):
+    """
+    Get user's monthly and all-time bandwidth usage in a single query.
+    
+    Args:
+        telegram_id (str): User's Telegram ID
+        year_month (str): Month as 'YYYY-MM' (default: current month)
+        
+    Returns:
+        tuple: (monthly bytes, total bytes)
+    """
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
+        with _get_conn() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT COALESCE(SUM(file_size), 0) 
-                FROM uploads 
-                WHERE telegram_id = ? AND status = 'success'
-            """, (str(telegram_id),))
-            result = cursor.fetchone()
-            return result[0] if result else 0
+            cursor.execute(SQL_GET_BANDWIDTH_STATS, (int(telegram_id), *_month_range(year_month)))
+            monthly, total = cursor.fetchone()
+            return monthly, total
     except Exception as e:
-        logger.error(f"Failed to get total bandwidth for user {telegram_id}: {str(e)}", exc_info=True)
-        return 0
+        logger.error(f"Failed to get bandwidth stats for user {telegram_id}: {str(e)}", exc_info=True)
+        return 0, 0
 
 # ============================================================================
 # ACCESS MANAGEMENT - Functions for managing user access and expiration
@@ -2198,55 +2835,96 @@ def mark_expired_users():
         list: List of users who were marked as expired
     """
     logger.info("Checking for expired whitelist users")
-    expired_users = []
+    # Expirations are stored as ISO-8601 text, so a string comparison against
+    # the current time is chronological and can use the partial expiry index.
+    now_iso = datetime.now().isoformat()
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
-            with conn:
-                cursor = conn.cursor()
-                
-                # Find expired users
-                cursor.execute("""
-                    SELECT telegram_id, username, name, expiration_time
-                    FROM whitelisted_users 
-                    WHERE expiration_time IS NOT NULL 
-                    AND expiration_time <= CURRENT_TIMESTAMP
-                """)
-                
-                expired_records = cursor.fetchall()
-                
-                for record in expired_records:
-                    telegram_id, username, name, expiration_time = record
-                    
-                    # Log the expiration event
-                    log_cloudverse_history_event(
-                        telegram_id=telegram_id,
-                        username=username,
-                        user_role="whitelist",
-                        action_taken="access_expired",
-                        status="expired",
-                        event_details=f"Whitelist access expired at {expiration_time}"
-                    )
-                    
-                    # Remove from whitelist
-                    cursor.execute("DELETE FROM whitelisted_users WHERE telegram_id = ?", (telegram_id,))
-                    
-                    expired_users.append({
-                        'telegram_id': telegram_id,
-                        'username': username,
-                        'name': name,
-                        'expiration_time': expiration_time
-                    })
-                
-                logger.info(f"Marked {len(expired_users)} users as expired")
-                return expired_users
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            # One set-based statement removes every expired row and hands back
+            # what the caller needs, instead of a SELECT followed by a DELETE.
+            # The name is split into first/last at the first space in SQL.
+            cursor.execute("""
+                DELETE FROM whitelisted_users
+                WHERE expiration_time IS NOT NULL
+                AND expiration_time <= ?
+                RETURNING telegram_id, username, name,
+                    CASE WHEN instr(name, ' ') > 0 THEN substr(name, 1, instr(name, ' ') - 1)
+                         ELSE COALESCE(name, '') END AS first_name,
+                    CASE WHEN instr(name, ' ') > 0 THEN substr(name, instr(name, ' ') + 1)
+                         ELSE '' END AS last_name,
+                    expiration_time
+            """, (now_iso,))
+            expired_users = [dict(row) for row in cursor.fetchall()]
+            if expired_users:
+                _invalidate_analytics()
+        for user in expired_users:
+            _invalidate_user(user['telegram_id'])
     except Exception as e:
         logger.error(f"Failed to mark expired users: {str(e)}", exc_info=True)
         return []
 
+    log_cloudverse_history_events_many(
+        dict(
+            telegram_id=user['telegram_id'],
+            username=user['username'],
+            user_role="whitelist",
+            action_taken="access_expired",
+            status="expired",
+            event_details=f"Whitelist access expired at {user['expiration_time']}"
+        ) for user in expired_users
+    )
+
+    logger.info(f"Marked {len(expired_users)} users as expired")
+    return expired_users
+
 # ============================================================================
 # ANALYTICS AND REPORTING - Functions for system analytics and reporting
 # ============================================================================
 
+# One row per admin, whitelisted and blacklisted user. `extra` carries the one
+# table-specific column each kind reports (see _ANALYTICS_USER_EXTRA)
+SQL_ALL_USERS_FOR_ANALYTICS = """
+    SELECT telegram_id, username, name,
+           CASE WHEN is_super_admin THEN 'super_admin' ELSE 'admin' END AS user_type,
+           promoted_at AS joined_at, NULL AS extra, is_super_admin
+    FROM administrators
+    UNION ALL
+    SELECT telegram_id, username, name, 'whitelist', approved_at, expiration_time, 0
+    FROM whitelisted_users
+    UNION ALL
+    SELECT telegram_id, username, name, 'blacklist', restricted_at, restriction_type, 0
+    FROM blacklisted_users
+"""
+_ANALYTICS_USER_EXTRA = {'whitelist': 'expiration_time', 'blacklist': 'restriction_type'}
+# One page of the same rows, newest first; telegram_id keeps ties in a stable order
+SQL_ALL_USERS_FOR_ANALYTICS_PAGE = SQL_ALL_USERS_FOR_ANALYTICS + """
+    ORDER BY joined_at DESC, telegram_id
+    LIMIT ? OFFSET ?
+"""
+SQL_COUNT_USERS_FOR_ANALYTICS = """
+    SELECT (SELECT COUNT(*) FROM administrators)
+         + (SELECT COUNT(*) FROM whitelisted_users)
+         + (SELECT COUNT(*) FROM blacklisted_users)
+"""
+
+def _analytics_user(row):
+    """Map a SQL_ALL_USERS_FOR_ANALYTICS row to the analytics user dict."""
+    telegram_id, username, name, user_type, joined_at, extra, super_admin = row
+    user = {
+        'telegram_id': telegram_id,
+        'username': username,
+        'name': name,
+        'user_type': user_type,
+        'joined_at': joined_at
+    }
+    extra_key = _ANALYTICS_USER_EXTRA.get(user_type)
+    if extra_key:
+        user[extra_key] = extra
+    user['is_super_admin'] = bool(super_admin)
+    return user
+
 def get_all_users_for_analytics():
     """
     Get all users from various tables for analytics reporting.
@@ -2259,69 +2937,13 @@ def get_all_users_for_analytics():
     """
     logger.debug("Retrieving all users for analytics")
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
+        with _get_conn() as conn:
             cursor = conn.cursor()
+            # Administrators, whitelisted and blacklisted users in one statement
+            cursor.execute(SQL_ALL_USERS_FOR_ANALYTICS)
+            all_users = [_analytics_user(row) for row in cursor]
             
-            all_users = []
-            
-            # Get administrators
-            cursor.execute("""
-                SELECT telegram_id, username, name, 'admin' as user_type, 
-                       is_super_admin, promoted_at as joined_at
-                FROM administrators
-            """)
-            admin_rows = cursor.fetchall()
-            
-            for row in admin_rows:
-                user_type = 'super_admin' if row[4] else 'admin'
-                all_users.append({
-                    'telegram_id': row[0],
-                    'username': row[1],
-                    'name': row[2],
-                    'user_type': user_type,
-                    'joined_at': row[5],
-                    'is_super_admin': bool(row[4])
-                })
-            
-            # Get whitelisted users
-            cursor.execute("""
-                SELECT telegram_id, username, name, 'whitelist' as user_type,
-                       approved_at as joined_at, expiration_time
-                FROM whitelisted_users
-            """)
-            whitelist_rows = cursor.fetchall()
-            
-            for row in whitelist_rows:
-                all_users.append({
-                    'telegram_id': row[0],
-                    'username': row[1],
-                    'name': row[2],
-                    'user_type': row[3],
-                    'joined_at': row[4],
-                    'expiration_time': row[5],
-                    'is_super_admin': False
-                })
-            
-            # Get blacklisted users
-            cursor.execute("""
-                SELECT telegram_id, username, name, 'blacklist' as user_type,
-                       restricted_at as joined_at, restriction_type
-                FROM blacklisted_users
-            """)
-            blacklist_rows = cursor.fetchall()
-            
-            for row in blacklist_rows:
-                all_users.append({
-                    'telegram_id': row[0],
-                    'username': row[1],
-                    'name': row[2],
-                    'user_type': row[3],
-                    'joined_at': row[4],
-                    'restriction_type': row[5],
-                    'is_super_admin': False
-                })
-            
-            logger.debug(f"Retrieved {len(all_users)} users for analytics")
+            logger.debug("Retrieved %s users for analytics", len(all_users))
             return all_users
     except Exception as e:
         logger.error(f"Failed to get all users for analytics: {str(e)}", exc_info=True)
@@ -2338,17 +2960,15 @@ def get_all_users_for_analytics_paginated(page=1, page_size=20):
     Returns:
         dict: Dictionary containing users list and pagination info
     """
-    logger.debug(f"Getting paginated users for analytics: page={page}, size={page_size}")
+    logger.debug("Getting paginated users for analytics: page=%s, size=%s", page, page_size)
     try:
-        all_users = get_all_users_for_analytics()
-        
-        # Calculate pagination
-        total_users = len(all_users)
+        # Only the requested page is read; the total comes from cached per-table counts
+        total_users = _count_users(SQL_COUNT_USERS_FOR_ANALYTICS)
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_ALL_USERS_FOR_ANALYTICS_PAGE, (page_size, (page - 1) * page_size))
+            paginated_users = [_analytics_user(row) for row in cursor]
         total_pages = (total_users + page_size - 1) // page_size
-        start_index = (page - 1) * page_size
-        end_index = start_index + page_size
-        
-        paginated_users = all_users[start_index:end_index]
         
         return {
             'users': paginated_users,
@@ -2378,17 +2998,17 @@ def get_admins_paginated(page=1, page_size=10):
     Returns:
         dict: Dictionary containing admins list and pagination info
     """
-    logger.debug(f"Getting paginated admins: page={page}, size={page_size}")
+    logger.debug("Getting paginated admins: page=%s, size=%s", page, page_size)
     try:
-        all_admins = get_admins()
-        
-        # Calculate pagination
-        total_admins = len(all_admins)
+        total_admins = _count_users("SELECT COUNT(*) FROM administrators")
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            # Same order as get_admins (telegram_id is the rowid)
+            cursor.execute("SELECT telegram_id, username, name, is_super_admin FROM administrators ORDER BY telegram_id LIMIT ? OFFSET ?",
+                           (page_size, (page - 1) * page_size))
+            paginated_admins = [dict(row) for row in cursor]
         total_pages = (total_admins + page_size - 1) // page_size
-        start_index = (page - 1) * page_size
-        end_index = start_index + page_size
-        
-        paginated_admins = all_admins[start_index:end_index]
         
         return {
             'admins': paginated_admins,
@@ -2419,7 +3039,7 @@ def get_user_top_file_types(telegram_id, limit=5):
         list: List of tuples (file_type, count)
     """
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
+        with _get_conn() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT file_type, COUNT(*) as count
@@ -2428,7 +3048,7 @@ def get_user_top_file_types(telegram_id, limit=5):
                 GROUP BY file_type 
                 ORDER BY count DESC 
                 LIMIT ?
-            """, (str(telegram_id), limit))
+            """, (int(telegram_id), limit))
             return cursor.fetchall()
     except Exception as e:
         logger.error(f"Failed to get top file types for user {telegram_id}: {str(e)}", exc_info=True)
@@ -2446,19 +3066,11 @@ def get_user_upload_activity_by_hour(telegram_id, days=30):
         list: List of tuples (hour, count)
     """
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
+        with _get_conn() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT strftime('%H', uploaded_at) as hour, COUNT(*) as count
-                FROM uploads 
-                WHERE telegram_id = ? 
-                AND uploaded_at >= DATE('now', '-{} days')
-                GROUP BY strftime('%H', uploaded_at)
-                ORDER BY hour
-            """.format(days), (str(telegram_id),))
+            cursor.execute(SQL_USER_UPLOADS_BY_HOUR, (int(telegram_id), f"-{int(days)} days"))
             
-            # Convert hour strings to integers
-            results = [(int(row[0]), row[1]) for row in cursor.fetchall()]
+            results = [(row[0], row[1]) for row in cursor.fetchall() if row[0] is not None]
             return results
     except Exception as e:
         logger.error(f"Failed to get upload activity by hour for user {telegram_id}: {str(e)}", exc_info=True)
@@ -2477,9 +3089,9 @@ def get_user_details_by_id(telegram_id):
     Returns:
         dict: Dictionary containing comprehensive user information
     """
-    logger.debug(f"Getting user details for {telegram_id}")
+    logger.debug("Getting user details for %s", telegram_id)
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
+        with _get_conn() as conn:
             cursor = conn.cursor()
             
             user_details = {
@@ -2493,92 +3105,40 @@ def get_user_details_by_id(telegram_id):
                 'last_activity': None
             }
             
-            # Check administrators table
-            cursor.execute("""
-                SELECT username, name, is_super_admin, promoted_at, last_updated
-                FROM administrators WHERE telegram_id = ?
-            """, (str(telegram_id),))
-            admin_row = cursor.fetchone()
-            
-            if admin_row:
-                user_details.update({
-                    'found': True,
-                    'user_type': 'super_admin' if admin_row[2] else 'admin',
-                    'username': admin_row[0],
-                    'name': admin_row[1],
-                    'status': 'active',
-                    'joined_at': admin_row[3],
-                    'last_activity': admin_row[4]
-                })
-                return user_details
-            
-            # Check whitelisted_users table
-            cursor.execute("""
-                SELECT username, name, approved_at, expiration_time, last_updated
-                FROM whitelisted_users WHERE telegram_id = ?
-            """, (str(telegram_id),))
-            whitelist_row = cursor.fetchone()
-            
-            if whitelist_row:
-                status = 'active'
-                if whitelist_row[3]:  # has expiration_time
-                    # Check if expired
-                    cursor.execute("SELECT CURRENT_TIMESTAMP > ? as is_expired", (whitelist_row[3],))
-                    is_expired = cursor.fetchone()[0]
-                    status = 'expired' if is_expired else 'active'
-                
-                user_details.update({
-                    'found': True,
-                    'user_type': 'whitelist',
-                    'username': whitelist_row[0],
-                    'name': whitelist_row[1],
-                    'status': status,
-                    'joined_at': whitelist_row[2],
-                    'expiration_time': whitelist_row[3],
-                    'last_activity': whitelist_row[4]
-                })
-                return user_details
-            
-            # Check blacklisted_users table
-            cursor.execute("""
-                SELECT username, name, restriction_type, restricted_at, restriction_period
-                FROM blacklisted_users WHERE telegram_id = ?
-            """, (str(telegram_id),))
-            blacklist_row = cursor.fetchone()
-            
-            if blacklist_row:
-                user_details.update({
-                    'found': True,
-                    'user_type': 'blacklist',
-                    'username': blacklist_row[0],
-                    'name': blacklist_row[1],
-                    'status': 'restricted',
-                    'restriction_type': blacklist_row[2],
-                    'joined_at': blacklist_row[3],
-                    'restriction_period': blacklist_row[4]
-                })
-                return user_details
-            
-            # Check pending_users table
-            cursor.execute("""
-                SELECT username, first_name, last_name, requested_at
-                FROM pending_users WHERE telegram_id = ?
-            """, (str(telegram_id),))
-            pending_row = cursor.fetchone()
+            # Search administrators, whitelist, blacklist and pending users in one statement
+            user_id = int(telegram_id)
+            cursor.execute(SQL_GET_USER_DETAILS, (user_id, user_id, user_id, user_id))
+            row = cursor.fetchone()
             
-            if pending_row:
-                full_name = f"{pending_row[1] or ''} {pending_row[2] or ''}".strip()
+            if row:
+                _, user_type, username, name, joined_at, last_activity, expiration_time, restriction_type, restriction_period = row
                 user_details.update({
                     'found': True,
-                    'user_type': 'pending',
-                    'username': pending_row[0],
-                    'name': full_name,
-                    'status': 'pending',
-                    'joined_at': pending_row[3]
+                    'user_type': user_type,
+                    'username': username,
+                    'name': name,
+                    'joined_at': joined_at
                 })
+                if user_type in ('admin', 'super_admin'):
+                    user_details.update({'status': 'active', 'last_activity': last_activity})
+                elif user_type == 'whitelist':
+                    expired = expiration_time is not None and expiration_time <= datetime.now().isoformat()
+                    user_details.update({
+                        'status': 'expired' if expired else 'active',
+                        'expiration_time': expiration_time,
+                        'last_activity': last_activity
+                    })
+                elif user_type == 'blacklist':
+                    user_details.update({
+                        'status': 'restricted',
+                        'restriction_type': restriction_type,
+                        'restriction_period': restriction_period
+                    })
+                else:
+                    user_details['status'] = 'pending'
                 return user_details
             
-            logger.debug(f"User {telegram_id} not found in any table")
+            logger.debug("User %s not found in any table", telegram_id)
             return user_details
             
     except Exception as e:
@@ -2601,16 +3161,9 @@ def get_user_uploads_per_day(telegram_id, days=30):
         list: List of tuples (date, count)
     """
     try:
-        with sqlite3.connect(str(DB_PATH), timeout=20.0) as conn:
+        with _get_conn() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT DATE(uploaded_at) as upload_date, COUNT(*) as count
-                FROM uploads 
-                WHERE telegram_id = ? 
-                AND uploaded_at >= DATE('now', '-{} days')
-                GROUP BY DATE(uploaded_at)
-                ORDER BY upload_date DESC
-            """.format(days), (str(telegram_id),))
+            cursor.execute(SQL_USER_UPLOADS_BY_DAY, (int(telegram_id), f"-{int(days)} days"))
             return cursor.fetchall()
     except Exception as e:
         logger.error(f"Failed to get uploads per day for user {telegram_id}: {str(e)}", exc_info=True)